@@ -1,9 +1,15 @@
+import collections
+import importlib
 import inspect
 import itertools
+import json
 import logging
+import os
 
 import doit
 
+from .misc import HashChecker, path_key
+from .registry import Registry
 from .task import Task
 from .task_factory import TaskFactory
 from .task_graph import TaskGraph
@@ -11,106 +17,289 @@ from .task_graph import TaskGraph
 # NOTE: task_factory decorator hides task_factory module
 from .decorators import command_factory, file_dep, target, task_factory
 
+# Sub-modules with heavy dependencies are loaded on first use
+_lazy_modules = ["ants", "executor", "export", "runner", "spm"]
+
+def __getattr__(name):
+    if name in _lazy_modules:
+        return importlib.import_module(".{}".format(name), __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
 ################################################################################
 # Replace doit's task loader to include objects created by TaskFactory         #
 ################################################################################
 
-doit_loader_load_tasks = None
-def spire_load_tasks(*args, **kwargs):
-    tasks = doit_loader_load_tasks(*args, **kwargs)
+# Members of TaskFactory objects used to create their doit task
+_task_members = [
+    "basename", "file_dep", "targets", "actions", "clean", "skipped",
+    "resources"]
+
+def _get_state(object_):
+    """ Return a shallow copy of the members of an object used to create its
+        doit task.
+    """
     
-    for object_ in TaskFactory._task_registry:
-        if getattr(object_, "skipped", False):
-            continue
+    state = []
+    for name in _task_members:
+        value = getattr(object_, name, None)
+        state.append(tuple(value) if isinstance(value, list) else value)
+    return state
+
+def _same_state(state_1, state_2):
+    """ Test whether two states of an object (cf. _get_state) are identical.
+        Items which cannot be compared (e.g. NumPy arrays) are only identical
+        to themselves.
+    """
+    
+    def same(value_1, value_2):
+        if value_1 is value_2:
+            return True
+        elif isinstance(value_1, tuple) and isinstance(value_2, tuple):
+            return (
+                len(value_1) == len(value_2)
+                and all(same(x, y) for x, y in zip(value_1, value_2)))
+        try:
+            return bool(value_1 == value_2)
+        except Exception:
+            return False
+    
+    return all(same(x, y) for x, y in zip(state_1, state_2))
+
+def _get_task(object_):
+    """ Return the doit task created from a TaskFactory object of the current
+        registry, creating it only on the first call and when the object was
+        modified since the previous call.
+    """
+    
+    registry = Registry.current()
+    doit_tasks = registry.doit_tasks
+    entry = doit_tasks.get(id(object_))
+    state = _get_state(object_)
+    if entry is None or entry[0] is not object_ or not _same_state(entry[1], state):
+        if entry is not None and entry[0] is object_:
+            # Task graphs including the previous task are out-of-date
+            registry.version += 1
         
+        task = None
         dict_ = object_.as_task_dict()
-        if dict_ is None:
+        if dict_ is not None:
+            dict_["name"] = dict_.pop("basename")
+            # Replace None with "" to avoid an error on task creation
+            dict_["file_dep"] = [x or "" for x in dict_["file_dep"]]
+            
+            task = doit.task.dict_to_task(dict_)
+        entry = (object_, state, task)
+        doit_tasks[id(object_)] = entry
+    
+    return entry[2]
+
+def _get_registry_tasks(objects=None):
+    """ Return the TaskFactory objects and the doit tasks created from them,
+        for the given objects or for all objects of the current registry.
+        Skipped objects are ignored.
+    """
+    
+    if objects is None:
+        objects = Registry.current()
+    
+    tasks = []
+    for object_ in objects:
+        if getattr(object_, "skipped", False):
+            continue
+        task = _get_task(object_)
+        if task is not None:
+            tasks.append((object_, task))
+    return tasks
+
+def _get_closure(names, tasks):
+    """ Return the TaskFactory objects required to run the tasks or targets in
+        names, i.e. the matching objects and their ancestors, including the
+        ancestors of the other tasks (non-Spire tasks) they depend on. Return
+        None if some names do not match a TaskFactory object (other tasks,
+        patterns, task options), in which case all objects must be loaded.
+    """
+    
+    other_tasks = {task.name: task for task in tasks}
+    
+    root = os.getcwd()
+    by_name = {}
+    by_target = {}
+    for object_ in Registry.current():
+        if getattr(object_, "skipped", False):
+            continue
+        by_name[str(object_.basename)] = object_
+        for target in object_.targets:
+            by_target.setdefault(path_key(target, root), object_)
+    # NOTE: other tasks are loaded, but the objects they depend on must be
+    # included in the closure
+    other_targets = {}
+    for task in tasks:
+        for target in task.targets:
+            other_targets.setdefault(path_key(target, root), task)
+    
+    closure = {}
+    queue = collections.deque()
+    for name in names:
+        if name in other_tasks or name.startswith("-") or "*" in name:
+            return None
+        object_ = by_name.get(name) or by_target.get(path_key(name, root))
+        if object_ is None:
+            return None
+        queue.append(object_)
+    
+    visited = set()
+    while queue:
+        item = queue.popleft()
+        if id(item) in visited:
             continue
+        visited.add(id(item))
         
-        dict_["name"] = dict_.pop("basename")
-        # Replace None with "" to avoid an error on task creation
-        dict_["file_dep"] = [x or "" for x in dict_["file_dep"]]
-            
-        tasks.append(doit.task.dict_to_task(dict_))
-            
+        if isinstance(item, doit.task.Task):
+            if item.wild_dep:
+                return None
+            for name in itertools.chain(item.task_dep, item.setup_tasks):
+                parent = by_name.get(name) or other_tasks.get(name)
+                if parent is not None:
+                    queue.append(parent)
+        else:
+            closure[id(item)] = item
+        
+        for entry in item.file_dep:
+            if not entry:
+                continue
+            key = path_key(entry, root)
+            parent = by_target.get(key) or other_targets.get(key)
+            if parent is not None and id(parent) not in visited:
+                queue.append(parent)
+    
+    return list(closure.values())
+
+doit_loader_load_tasks = None
+def spire_load_tasks(*args, **kwargs):
+    tasks = doit_loader_load_tasks(*args, **kwargs)
+    
+    # When running specific tasks, only create the doit tasks they require
+    objects = None
+    if kwargs.get("allow_delayed") and kwargs.get("args"):
+        objects = _get_closure(kwargs["args"], tasks)
+    
+    tasks.extend(task for _, task in _get_registry_tasks(objects))
     return tasks
     
 if doit.loader.load_tasks != spire_load_tasks:
     doit_loader_load_tasks = doit.loader.load_tasks
     doit.loader.load_tasks = spire_load_tasks
 
+def _get_module_key(namespace):
+    return namespace.get("__file__", id(namespace))
+
+def _get_graph(namespace):
+    """ Return the task graph of a module, re-using the previous results if the
+        current registry was not modified.
+    """
+    
+    registry = Registry.current()
+    key = _get_module_key(namespace)
+    
+    # Update the doit tasks of modified objects, and the registry version
+    _get_registry_tasks()
+    state = (registry.version, os.getcwd())
+    
+    cached = registry.graphs.get(key)
+    if cached is None or cached[0] != state:
+        tasks = doit.loader.load_tasks(namespace)
+        
+        # Spire tasks, from the namespace and from the registry
+        spire_tasks = {
+            x.basename: x for x in namespace.values()
+            if isinstance(x, type) and issubclass(x, Task) and x is not Task}
+        spire_tasks.update(
+            (task.name, object_) for object_, task in _get_registry_tasks())
+        
+        # NOTE: doit has already changed to the directory specified by -d
+        cached = (state, TaskGraph(tasks, state[1], spire_tasks))
+        registry.graphs[key] = cached
+    
+    return cached[1]
+
 ################################################################################
 # Prune the task graph from tasks having None in their file_dep                #
 ################################################################################
 
-def prune():
-    caller = inspect.getouterframes(inspect.currentframe())[1][0]
-    tasks = doit.loader.load_tasks(caller.f_globals)
+def prune(dump=None):
+    """ Skip the tasks having None in their file_dep, and their descendants.
+        
+        A summary of the skipped tasks is logged; if dump is specified, the
+        tree of skipped tasks is also saved to this path in JSON format. Return
+        the names of the skipped tasks.
+    """
     
-    graph = TaskGraph(tasks)
+    caller = inspect.currentframe().f_back
+    graph = _get_graph(caller.f_globals)
     
-    to_skip = []
-    for name, doit_task in graph.doit_tasks.items():
-        if "" in doit_task.file_dep:
-            to_skip.append(name)
+    # Root cause and parent of each skipped task, filled in BFS order
+    roots = [
+        name for name, doit_task in graph.doit_tasks.items() 
+        if "" in doit_task.file_dep]
+    causes = {}
+    parents = {}
     
-    while len(to_skip) > 0:
-        root = to_skip.pop()
-        spire_task = graph.spire_tasks.get(root)
+    visited = set(roots)
+    queue = collections.deque((name, name, None) for name in roots)
+    while queue:
+        name, root, parent = queue.popleft()
+        
+        spire_task = graph.spire_tasks.get(name)
         if spire_task is None:
-            logging.info("Not a spire task: {}".format(root))
+            logging.info("Not a spire task: {}".format(name))
             continue
-        if not getattr(spire_task, "skipped", False):
-            logging.warning("Skipping {}".format(root))
-            spire_task.skipped = True
-            to_skip.extend(graph.children.get(root, []))
+        
+        spire_task.skipped = True
+        causes[name] = root
+        parents[name] = parent
+        for child in graph.children[name]:
+            if child not in visited:
+                visited.add(child)
+                queue.append((child, root, name))
+    
+    # Skipped tasks must not be part of the graph anymore
+    Registry.current().graphs.pop(_get_module_key(caller.f_globals), None)
+    
+    counts = collections.Counter(causes.values())
+    if causes:
+        logging.warning(
+            "Skipping {} task{}: {} with missing dependencies, {} depending on "
+            "skipped tasks".format(
+                len(causes), "s" if len(causes) > 1 else "",
+                len(counts), len(causes)-len(counts)))
+        logging.info("Skipped tasks per root: {}".format(
+            ", ".join("{} ({})".format(*x) for x in counts.most_common())))
+    
+    if dump is not None:
+        with open(dump, "w") as fd:
+            json.dump({"roots": counts, "parents": parents}, fd, indent=1)
+    
+    return set(causes)
 
 ################################################################################
 # Representation of the task graph in the Graphviz format                      #
 ################################################################################
 
-def graph(name_mapper=None):
-    caller = inspect.getouterframes(inspect.currentframe())[1][0]
-    tasks = doit.loader.load_tasks(caller.f_globals)
-    
-    graph = TaskGraph(tasks)
-    
-    if name_mapper is None:
-        name_mapper = lambda x: x
-    
-    def quote(name):
-        return "\"{}\"".format(name_mapper(name).replace("\"", "\\\""))
-    
-    lines = ["digraph {"]
-    
-    file_deps = set()
-    targets = set()
-    nodes = set()
-    for task in graph.doit_tasks.values():
-        file_deps.update(task.file_dep)
-        targets.update(task.targets)
-    for name, doit_task in graph.doit_tasks.items():
-        if name not in nodes:
-            lines.append("    {}[shape=box];".format(quote(name)))
-        for entry in graph.doit_tasks[name].file_dep:
-            if entry not in targets:
-                if entry not in nodes:
-                    lines.append(
-                        "    {}[shape=box,color=blue];".format(quote(entry)))
-                    nodes.add(entry)
-                lines.append("    {} -> {};".format(quote(entry), quote(name)))
-        for entry in graph.doit_tasks[name].targets:
-            if entry not in file_deps and entry != name:
-                if entry not in nodes:
-                    lines.append(
-                        "    {}[shape=box,color=blue];".format(quote(entry)))
-                    nodes.add(entry)
-                lines.append("    {} -> {};".format(quote(name), quote(entry)))
-    
-    for name, doit_task in graph.doit_tasks.items():
-        for child in graph.children[name]:
-            lines.append("    {} -> {};".format(quote(name), quote(child)))
+def graph(name_mapper=None, tasks_only=False, collapse=False, fd=None):
+    """ Return the representation of the task graph in the Graphviz format, or
+        write it to the file object fd if specified. See export.iter_dot for
+        the other parameters.
+    """
+    
+    from . import export
     
-    lines.extend(["}", ""])
+    caller = inspect.currentframe().f_back
+    graph = _get_graph(caller.f_globals)
     
-    return "\n".join(lines)
+    lines = export.iter_dot(
+        graph, tasks_only=tasks_only, name_mapper=name_mapper,
+        collapse=collapse)
+    if fd is None:
+        return "".join(lines)
+    else:
+        fd.writelines(lines)
@@ -1,25 +1,83 @@
 import argparse
+import json
 import os
-import subprocess
 import sys
-import tempfile
 
-def graph(tasks_path, dot_path, tasks_only, doit_arguments):
-    temp_fd, temp_path = tempfile.mkstemp(suffix=".py")
+import doit.doit_cmd
+import doit.loader
+
+import spire
+from spire import executor, export, runner
+
+def load(tasks_path, doit_arguments):
+    """ Load the tasks file in the current process, as "doit list" would, and
+        return its task graph. doit_arguments may contain the working directory
+        (-d/--dir) and command-line variables (name=value).
+    """
+    
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-d", "--dir", dest="cwd")
+    parser.add_argument("-k", "--seek-file", action="store_true")
+    options, others = parser.parse_known_args(doit_arguments)
+    
+    doit.doit_cmd.reset_vars()
+    for argument in others:
+        if not argument.startswith("-") and "=" in argument:
+            doit.doit_cmd.set_var(*argument.split("=", 1))
+    
+    # NOTE: doit changes the working directory to the directory specified by -d
+    module = doit.loader.get_module(tasks_path, options.cwd, options.seek_file)
+    return spire._get_graph(vars(module))
+
+def graph(
+        tasks_path, dot_path, tasks_only, doit_arguments,
+        format="dot", collapse=False):
+    directory = os.getcwd()
+    dot_path = os.path.join(directory, dot_path)
     try:
-        with open(tasks_path) as fd:
-            os.write(temp_fd, fd.read().encode())
-        os.write(
-            temp_fd, 
-            "\n"
-            "import spire\n"
-            "graph = spire.graph({})\n"
-            "with open(\"{}\", \"w\") as fd:\n"
-            "    fd.write(graph)\n".format(tasks_only, dot_path).encode())
-        os.close(temp_fd)
-        subprocess.check_call(["doit", "list", "-f", temp_path]+doit_arguments)
+        graph = load(tasks_path, doit_arguments)
+        with open(dot_path, "w") as fd:
+            if format == "dot":
+                fd.writelines(export.iter_dot(graph, tasks_only, None, collapse))
+            elif format == "json":
+                json.dump(export.as_dict(graph), fd, indent=1)
+            elif format == "graphml":
+                fd.writelines(export.iter_graphml(graph))
+            else:
+                raise Exception("Unknown format: {}".format(format))
     finally:
-        os.remove(temp_path)
+        os.chdir(directory)
+
+def diff(old, new):
+    with open(old) as fd:
+        old = json.load(fd)
+    with open(new) as fd:
+        new = json.load(fd)
+    json.dump(export.diff(old, new), sys.stdout, indent=1)
+    sys.stdout.write("\n")
+
+def run(doit_arguments):
+    """ Run the tasks, as "doit run" would, within the resources of the
+        machine.
+    """
+    
+    return runner.DoitMain().run(["run", *doit_arguments])
+
+def submit(tasks_path, doit_arguments, executor_name, tasks, scripts_directory):
+    """ Submit the tasks, or only the specified tasks and the tasks they depend
+        on, to a batch scheduler.
+    """
+    
+    directory = os.getcwd()
+    try:
+        graph = load(tasks_path, doit_arguments)
+    finally:
+        os.chdir(directory)
+    
+    executor_ = executor.executors[executor_name](
+        tasks_path, doit_arguments, scripts_directory)
+    for job in executor_.submit(graph, tasks or None):
+        print(job)
 
 if __name__ == "__main__":
     action = sys.argv[1]
@@ -32,9 +90,43 @@ if __name__ == "__main__":
             "dot_path", metavar="tasks.dot", help="Path to the task graph")
         parser.add_argument(
             "--tasks-only", action="store_true", help="Create nodes for tasks only")
+        parser.add_argument(
+            "--collapse", action="store_true",
+            help="Create a single node for the tasks of the same class")
+        parser.add_argument(
+            "--format", choices=["dot", "json", "graphml"], default="dot",
+            help="Output format")
         arguments, doit_arguments = parser.parse_known_args(sys.argv[2:])
         
-        arguments.dot_path = os.path.abspath(arguments.dot_path)
-        
         sys.exit(graph(doit_arguments=doit_arguments, **vars(arguments)))
+    elif action == "diff":
+        parser = argparse.ArgumentParser(
+            description="Compare two JSON representations of task graphs")
+        parser.add_argument(
+            "old", metavar="old.json", help="Path to the old task graph")
+        parser.add_argument(
+            "new", metavar="new.json", help="Path to the new task graph")
+        arguments = parser.parse_args(sys.argv[2:])
+        
+        sys.exit(diff(**vars(arguments)))
+    elif action == "submit":
+        parser = argparse.ArgumentParser(
+            description="Submit the tasks to a batch scheduler")
+        parser.add_argument(
+            "tasks_path", metavar="tasks.py", help="Path to the task graph")
+        parser.add_argument(
+            "--executor", dest="executor_name",
+            choices=sorted(executor.executors), default="slurm",
+            help="Batch scheduler")
+        parser.add_argument(
+            "--task", dest="tasks", action="append", metavar="NAME",
+            help="Submit only this task and the tasks it depends on")
+        parser.add_argument(
+            "--scripts-directory", default=".spire-jobs",
+            help="Directory where the job scripts are written")
+        arguments, doit_arguments = parser.parse_known_args(sys.argv[2:])
         
+        sys.exit(submit(doit_arguments=doit_arguments, **vars(arguments)))
+    elif action == "run":
+        # NOTE: the arguments are parsed by doit
+        sys.exit(run(sys.argv[2:]))
@@ -14,57 +14,120 @@ file_dep = typing.NewType("file_dep", path)
 #: Type hint for target arguments to a function
 target = typing.NewType("target", path)
 
-def _get_task_info(action, *args, **kwargs):
-    """Return the file_dep and targets of a bound function"""
-    
-    signature = inspect.signature(action)
-    parameters = signature.parameters
-    arguments = signature.bind(*args, **kwargs).arguments
-    
-    # Check if argument is a "true" sequence, i.e. not a string/Path
-    is_iterable = lambda x: (
+def _is_iterable(x):
+    """ Check if argument is a "true" sequence, i.e. not a string/Path """
+    return (
         (
             isinstance(x, collections.abc.Iterable)
             or isinstance(x, collections.abc.Sequence))
         and not isinstance(x, (str, pathlib.Path)))
+
+class _Parameters(object):
+    """ Parameters of a function annotated as file_dep or target, computed once
+        so that the arguments of a call can be bound without inspect.
+    """
     
-    file_deps = []
-    targets = []
-    for name, value in parameters.items():
-        if value.annotation in [file_dep, target]:
+    def __init__(self, action):
+        self.signature = inspect.signature(action)
+        parameters = list(self.signature.parameters.values())
+        
+        # Name of annotated parameters, and whether they are file_dep
+        self.annotated = [
+            (x.name, x.annotation is file_dep) for x in parameters
+            if x.annotation in [file_dep, target]]
+        
+        # Fast binding is possible only without positional-only and variadic
+        # parameters
+        self.fast = all(
+            x.kind in [x.POSITIONAL_OR_KEYWORD, x.KEYWORD_ONLY]
+            for x in parameters)
+        self.positional = [
+            x.name for x in parameters if x.kind == x.POSITIONAL_OR_KEYWORD]
+        self.names = set(x.name for x in parameters)
+        self.required = [
+            (position, parameter.name)
+            for position, parameter in enumerate(parameters)
+            if parameter.default is parameter.empty]
+    
+    def bind(self, args, kwargs):
+        """ Return the explicitly-passed arguments of a call, by name """
+        
+        if (
+                not self.fast or len(args) > len(self.positional)
+                or not self.names.issuperset(kwargs)
+                or any(x in kwargs for x in self.positional[:len(args)])
+                or any(
+                    position >= len(args) and name not in kwargs
+                    for position, name in self.required)):
+            # Let inspect handle the general case, and raise the errors
+            return self.signature.bind(*args, **kwargs).arguments
+        
+        arguments = dict(zip(self.positional, args))
+        arguments.update(kwargs)
+        return arguments
+    
+    def get_task_info(self, args, kwargs):
+        """ Return the file_dep and targets of a call """
+        
+        arguments = self.bind(args, kwargs)
+        
+        file_deps = []
+        targets = []
+        for name, is_file_dep in self.annotated:
             if name not in arguments:
                 continue
             
             argument = arguments[name]
             
-            target_list = file_deps if value.annotation is file_dep else targets
+            target_list = file_deps if is_file_dep else targets
             
-            if is_iterable(argument):
+            if _is_iterable(argument):
                 target_list.extend(argument)
             elif argument is not None:
                 target_list.append(argument)
+        
+        return file_deps, targets
+
+@functools.lru_cache(maxsize=None)
+def _get_parameters(action):
+    return _Parameters(action)
+
+def _get_task_info(action, *args, **kwargs):
+    """Return the file_dep and targets of a bound function"""
     
-    return file_deps, targets
+    return _get_parameters(action).get_task_info(args, kwargs)
 
 def _create_factory_class(
         function, get_action, extra={},
-        file_dep_modifier=None, targets_modifier=None):
+        file_dep_modifier=None, targets_modifier=None, resources=None):
     """Create a wrapper TaskFactory-derived class around function
     
     :param get_action: function creating the task action
     :param extra: extra members to be added to the class
+    :param resources: default resources of the objects
     """
+    parameters = _get_parameters(function)
+    
     def __init__(self, *args, **kwargs):
-        file_dep, targets = _get_task_info(function, *args, **kwargs)
+        file_dep, targets = parameters.get_task_info(args, kwargs)
         
         spire.TaskFactory.__init__(self, str(targets[0]))
-        self.file_dep = file_dep_modifier(file_dep) if file_dep_modifier else file_dep
-        self.targets = targets_modifier(targets) if targets_modifier else targets
-        self.actions = [get_action(*args, **kwargs)]
+        # NOTE: tuples are more compact than lists
+        self.file_dep = tuple(
+            file_dep_modifier(file_dep) if file_dep_modifier else file_dep)
+        self.targets = tuple(
+            targets_modifier(targets) if targets_modifier else targets)
+        self.actions = (get_action(*args, **kwargs), )
+        if resources is not None:
+            # NOTE: stored in the slot, so that objects may override it
+            self.resources = resources
     
+    # NOTE: objects of the generated class do not have a __dict__, only the 
+    # slots of TaskFactory
     cls = type(
         function.__name__, (spire.TaskFactory, ),
-        {"__init__": __init__, "__doc__": function.__doc__} | extra)
+        {"__init__": __init__, "__doc__": function.__doc__, "__slots__": ()} 
+        | extra)
     
     functools.update_wrapper(cls.__init__, function)
     # Update the original signature to include "self"
@@ -73,35 +136,49 @@ def _create_factory_class(
         parameters=[
             inspect.Parameter("self", inspect.Parameter.POSITIONAL_OR_KEYWORD),
             *signature.parameters.values()])
+    # NOTE: the class replaces the function in its module, and is pickled by
+    # reference through its qualified name
     cls.__module__ = function.__module__
+    cls.__qualname__ = function.__qualname__
     
     return cls
 
-def task_factory(action=None, /, file_dep=None, targets=None):
+def task_factory(
+        action=None, /, file_dep=None, targets=None, resources=None):
     """Convert a function to a TaskFactory having the function as its only
     action. The file_dep and targets are extracted from the type hints of
-    the function"""
+    the function. The resources required by the task may be specified as in
+    TaskFactory"""
     
     def decorator(action):
-        return _create_factory_class(
+        cls = _create_factory_class(
             action, lambda *args, **kwargs: (action, args, kwargs),
             {"action": action},
-            file_dep_modifier=file_dep, targets_modifier=targets)
+            file_dep_modifier=file_dep, targets_modifier=targets,
+            resources=resources)
+        # Since the name of the function now refers to the class, make the
+        # function reachable through the class so that the actions are pickled
+        # by reference, e.g. by the multi-process runner of doit.
+        action.__qualname__ = "{}.action".format(cls.__qualname__)
+        return cls
     
     if action is not None:
         return decorator(action)
     else:
         return decorator
 
-def command_factory(action=None, /, file_dep=None, targets=None):
+def command_factory(
+        action=None, /, file_dep=None, targets=None, resources=None):
     """Convert a function to a TaskFactory having the command returned as a
     list by the function as its only action. The file_dep and targets are
-    extracted from the type hints of the function"""
+    extracted from the type hints of the function. The resources required by
+    the task may be specified as in TaskFactory"""
     
     def decorator(action):
         return _create_factory_class(
             action, lambda *args, **kwargs: action(*args, **kwargs),
-            file_dep_modifier=file_dep, targets_modifier=targets)
+            file_dep_modifier=file_dep, targets_modifier=targets,
+            resources=resources)
     
     if action is not None:
         return decorator(action)
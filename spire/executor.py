@@ -0,0 +1,185 @@
+import abc
+import itertools
+import os
+import shlex
+import subprocess
+import sys
+
+from .runner import parse_memory
+
+class Executor(abc.ABC):
+    """ Submit the tasks of a task graph as jobs of a batch scheduler.
+        
+        The tasks are grouped by dependency level (cf. TaskGraph.get_levels,
+        which includes the task_dep, setup and calc_dep of doit tasks): each
+        level is submitted as a job array, which starts once the job array
+        of the previous level has succeeded. Each job of an array runs a single
+        task through doit, as "doit run" would in the current directory.
+        
+        Derived classes must define index_variable, the environment variable
+        containing the index of a job in its array, and submit_array.
+    """
+    
+    #: Environment variable containing the index of the job in its array
+    index_variable = None
+    
+    #: Index of the first job of an array
+    first_index = 0
+    
+    def __init__(
+            self, tasks_path, doit_arguments=(), scripts_directory=".spire-jobs",
+            backend="sqlite3"):
+        """ :param tasks_path: path to the tasks file
+            :param doit_arguments: other arguments passed to "doit run", e.g.
+                the working directory or command-line variables
+            :param scripts_directory: directory where the job scripts are
+                written
+            :param backend: dependency database backend of doit, which must
+                support concurrent access
+        """
+        
+        self.tasks_path = os.path.abspath(tasks_path)
+        self.doit_arguments = list(doit_arguments)
+        self.scripts_directory = os.path.abspath(scripts_directory)
+        self.backend = backend
+    
+    def submit(self, graph, names=None):
+        """ Submit the tasks of graph, or only the specified tasks and the
+            tasks they depend on, and return the identifiers of the job arrays.
+        """
+        
+        os.makedirs(self.scripts_directory, exist_ok=True)
+        
+        jobs = []
+        for index, level in enumerate(graph.get_levels(names)):
+            path = os.path.join(
+                self.scripts_directory, "level_{}.sh".format(index))
+            with open(path, "w") as fd:
+                fd.writelines(self.iter_script(level))
+            os.chmod(path, 0o755)
+            
+            jobs.append(
+                self.submit_array(
+                    path, len(level), jobs[-1:],
+                    self.get_resources(graph, level)))
+        return jobs
+    
+    def get_command(self, name):
+        """ Return the command running a single task. """
+        
+        return [
+            sys.executable, "-m", "doit", "run", "-f", self.tasks_path,
+            "--backend", self.backend, "--single", *self.doit_arguments, name]
+    
+    def iter_script(self, names):
+        """ Yield the lines of the shell script running the tasks of a job
+            array, selected by the index of the job.
+        """
+        
+        yield "#!/bin/sh\n"
+        yield "cd {}\n".format(shlex.quote(os.getcwd()))
+        yield "case \"${}\" in\n".format(self.index_variable)
+        for index, name in enumerate(names, self.first_index):
+            yield "    {}) exec {} ;;\n".format(
+                index, " ".join(shlex.quote(x) for x in self.get_command(name)))
+        yield "esac\n"
+        yield "echo \"Invalid job index: ${}\" >&2\n".format(self.index_variable)
+        yield "exit 1\n"
+    
+    def get_resources(self, graph, names):
+        """ Return the CPUs and memory required by the largest tasks of a job
+            array (cf. TaskFactory.resources).
+        """
+        
+        cpus, memory = 1, 0
+        for name in names:
+            resources = (graph.doit_tasks[name].meta or {}).get("resources") or {}
+            cpus = max(cpus, resources.get("cpus", 1))
+            memory = max(memory, parse_memory(resources.get("memory", 0)))
+        return {"cpus": cpus, "memory": memory}
+    
+    @abc.abstractmethod
+    def submit_array(self, script, count, dependencies, resources):
+        """ Submit count jobs running script, once all dependencies (job
+            identifiers) have succeeded, and return the job identifier.
+        """
+        
+        pass
+
+class SlurmExecutor(Executor):
+    """ Executor submitting the jobs to Slurm, through sbatch. """
+    
+    index_variable = "SLURM_ARRAY_TASK_ID"
+    
+    def __init__(self, *args, sbatch_arguments=(), **kwargs):
+        """ :param sbatch_arguments: other arguments passed to sbatch, e.g.
+                the partition or the account
+        """
+        
+        Executor.__init__(self, *args, **kwargs)
+        self.sbatch_arguments = list(sbatch_arguments)
+    
+    def submit_array(self, script, count, dependencies, resources):
+        command = [
+            "sbatch", "--parsable",
+            "--array={}-{}".format(
+                self.first_index, self.first_index+count-1),
+            "--cpus-per-task={}".format(resources["cpus"])]
+        if resources["memory"]:
+            command.append("--mem={}K".format(-(-resources["memory"]//1024)))
+        if dependencies:
+            command.append("--dependency=afterok:{}".format(":".join(dependencies)))
+        command += [*self.sbatch_arguments, script]
+        
+        output = subprocess.check_output(command, universal_newlines=True)
+        # NOTE: the output may contain the cluster name after the job id
+        return output.strip().split(";")[0]
+
+class LocalExecutor(Executor):
+    """ Stand-in for a batch scheduler, running the jobs on the local machine
+        as soon as they are submitted. A job array is not run if one of its
+        dependencies failed.
+    """
+    
+    index_variable = "SPIRE_JOB_INDEX"
+    
+    def __init__(self, *args, workers=None, **kwargs):
+        """ :param workers: maximum number of jobs running at the same time,
+                defaults to the number of CPUs
+        """
+        
+        Executor.__init__(self, *args, **kwargs)
+        self.workers = workers or os.cpu_count()
+        
+        # Job identifier, and whether the job array succeeded
+        self._ids = itertools.count(1)
+        self.jobs = {}
+    
+    def submit_array(self, script, count, dependencies, resources):
+        id_ = "local-{}".format(next(self._ids))
+        
+        if not all(self.jobs[x] for x in dependencies):
+            self.jobs[id_] = False
+            return id_
+        
+        success = True
+        indices = iter(range(self.first_index, self.first_index+count))
+        running = []
+        while True:
+            while len(running) < self.workers:
+                index = next(indices, None)
+                if index is None:
+                    break
+                environment = dict(os.environ)
+                environment[self.index_variable] = str(index)
+                running.append(subprocess.Popen([script], env=environment))
+            if not running:
+                break
+            process = running.pop(0)
+            success = (process.wait() == 0) and success
+        
+        self.jobs[id_] = success
+        return id_
+
+#: Available executors
+executors = {"local": LocalExecutor, "slurm": SlurmExecutor}
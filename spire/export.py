@@ -0,0 +1,194 @@
+import collections
+import html
+import itertools
+import json
+
+from . import misc
+from .misc import path_key
+
+def iter_tasks(graph):
+    """ Generate JSON-compatible descriptions of the tasks of a TaskGraph, in
+        topological order: name, file_dep, targets, digests of the actions
+        (cf. misc.uptodate) and parents.
+    """
+    
+    for name in graph.topological_order:
+        task = graph.doit_tasks[name]
+        yield {
+            "name": name, 
+            "file_dep": sorted(str(x) for x in task.file_dep),
+            "targets": [str(x) for x in task.targets],
+            "actions": [_get_digest(x) for x in task.actions],
+            "parents": graph.parents[name]}
+
+def as_dict(graph):
+    """ Return a JSON-compatible representation of a TaskGraph, cf. iter_tasks.
+    """
+    
+    return {"tasks": list(iter_tasks(graph))}
+
+def iter_graphml(graph):
+    """ Generate the representation of a TaskGraph in the GraphML format, line
+        by line. The lists of file_dep, targets and action digests are stored as
+        JSON strings.
+    """
+    
+    fields = ["file_dep", "targets", "actions"]
+    
+    yield "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"
+    yield "<graphml xmlns=\"http://graphml.graphdrawing.org/xmlns\">\n"
+    for field in fields:
+        yield (
+            "  <key id=\"{0}\" for=\"node\" attr.name=\"{0}\" "
+            "attr.type=\"string\"/>\n".format(field))
+    yield "  <graph id=\"tasks\" edgedefault=\"directed\">\n"
+    for task in iter_tasks(graph):
+        yield "    <node id={}>\n".format(_quote_attribute(task["name"]))
+        for field in fields:
+            yield "      <data key=\"{}\">{}</data>\n".format(
+                field, html.escape(json.dumps(task[field])))
+        yield "    </node>\n"
+        for parent in task["parents"]:
+            yield "    <edge source={} target={}/>\n".format(
+                _quote_attribute(parent), _quote_attribute(task["name"]))
+    yield "  </graph>\n"
+    yield "</graphml>\n"
+
+def diff(old, new):
+    """ Compare two representations of a task graph returned by as_dict. Return
+        the names of the added and removed tasks, the modified fields of the
+        changed tasks, and the tasks affected by the changes, i.e. the added
+        and changed tasks and their descendants.
+    """
+    
+    old_tasks = {x["name"]: x for x in old["tasks"]}
+    new_tasks = {x["name"]: x for x in new["tasks"]}
+    
+    added = [x for x in new_tasks if x not in old_tasks]
+    removed = [x for x in old_tasks if x not in new_tasks]
+    changed = {}
+    for name, task in new_tasks.items():
+        if name in old_tasks:
+            fields = [
+                x for x in ["file_dep", "targets", "actions"]
+                if task[x] != old_tasks[name][x]]
+            if fields:
+                changed[name] = fields
+    
+    children = collections.defaultdict(list)
+    for task in new["tasks"]:
+        for parent in task["parents"]:
+            children[parent].append(task["name"])
+    affected = set(added) | set(changed)
+    queue = collections.deque(affected)
+    while queue:
+        for child in children[queue.popleft()]:
+            if child not in affected:
+                affected.add(child)
+                queue.append(child)
+    
+    return {
+        "added": added, "removed": removed, "changed": changed,
+        # Keep the topological order
+        "affected": [x for x in new_tasks if x in affected]}
+
+def _quote_attribute(value):
+    # NOTE: xml.sax.saxutils is slow to import
+    return "\"{}\"".format(html.escape(value))
+
+def _get_digest(action):
+    try:
+        return misc._get_digest(action)
+    except KeyError:
+        # Action type not handled by Spire
+        return None
+
+def iter_dot(graph, tasks_only=False, name_mapper=None, collapse=False):
+    """ Generate the representation of a TaskGraph in the Graphviz format, line
+        by line. If tasks_only is True, the nodes of the file_dep and targets
+        are omitted. If collapse is True, the tasks created from the same class
+        are represented by a single node. name_mapper, if specified, is applied
+        to the names of the nodes.
+    """
+    
+    if name_mapper is None:
+        name_mapper = lambda x: x
+    
+    def quote(name):
+        return "\"{}\"".format(name_mapper(str(name)).replace("\"", "\\\""))
+    
+    yield "digraph {\n"
+    
+    if collapse:
+        yield from _iter_collapsed_dot(graph, quote)
+    elif tasks_only:
+        for name in graph.topological_order:
+            yield "    {}[shape=box];\n".format(quote(name))
+            for parent in graph.parents[name]:
+                yield "    {} -> {};\n".format(quote(parent), quote(name))
+    else:
+        # Name of the node of each file, using the first name it was found with
+        files = {}
+        def get_node(entry):
+            key = path_key(entry, graph.root)
+            if key not in files:
+                files[key] = entry
+                return entry, True
+            return files[key], False
+        
+        for name in graph.topological_order:
+            yield "    {}[shape=box];\n".format(quote(name))
+            
+            task = graph.doit_tasks[name]
+            file_dep = [
+                get_node(x) for x in sorted(task.file_dep)
+                if x and x not in graph.doit_tasks]
+            targets = [
+                get_node(x) for x in dict.fromkeys(task.targets)
+                if x not in graph.doit_tasks]
+            
+            for node, is_new in itertools.chain(file_dep, targets):
+                if is_new:
+                    yield "    {}[shape=parallelogram];\n".format(quote(node))
+            for node, _ in file_dep:
+                yield "    {} -> {};\n".format(quote(node), quote(name))
+            for node, _ in targets:
+                yield "    {} -> {};\n".format(quote(name), quote(node))
+    
+    yield "}\n"
+
+def _iter_collapsed_dot(graph, quote):
+    """ Generate the nodes and edges of a TaskGraph where the tasks of the same
+        class are grouped.
+    """
+    
+    groups = {name: _get_group(graph, name) for name in graph.doit_tasks}
+    sizes = collections.Counter(groups.values())
+    
+    nodes = set()
+    edges = set()
+    for name in graph.topological_order:
+        group = groups[name]
+        if group not in nodes:
+            nodes.add(group)
+            if sizes[group] == 1:
+                yield "    {}[shape=box];\n".format(quote(group))
+            else:
+                yield "    {}[shape=box3d,label={}];\n".format(
+                    quote(group), quote("{} ({})".format(group, sizes[group])))
+        for parent in graph.parents[name]:
+            edge = (groups[parent], group)
+            if edge[0] != edge[1] and edge not in edges:
+                edges.add(edge)
+                yield "    {} -> {};\n".format(*[quote(x) for x in edge])
+
+def _get_group(graph, name):
+    """ Return the class name of the TaskFactory object a task was created from,
+        or the task name for other tasks.
+    """
+    
+    spire_task = graph.spire_tasks.get(name)
+    if spire_task is None or isinstance(spire_task, type):
+        return name
+    else:
+        return type(spire_task).__name__
@@ -1,34 +1,383 @@
+import ast
+import atexit
+import functools
 import hashlib
+import inspect
+import os
+import pathlib
 import pickle
+import sys
+import textwrap
+import types
 
 import doit.action
+import doit.dependency
 
 def _command_digest(action):
+    # Identical commands are frequent across tasks (e.g. cleanup commands)
+    key = action.action if isinstance(action.action, str) else tuple(action.action)
+    try:
+        return _cached_command_digest(key)
+    except TypeError:
+        # Unhashable item in the command
+        return _cached_command_digest.__wrapped__(key)
+
+@functools.lru_cache(maxsize=2**16)
+def _cached_command_digest(command):
     hash = hashlib.sha1()
-    for item in action.action:
+    for item in command:
         hash.update(str(item).encode())
     return hash.hexdigest()
 
+#: Include the functions of the same package referenced by a Python action in
+#: its digest
+follow_references = True
+
 def _python_digest(action):
     hash = hashlib.sha1()
-    hash.update(action.py_callable.__code__.co_code)
-    hash.update(pickle.dumps(action.args))
-    hash.update(pickle.dumps(action.kwargs))
+    _update_function_digest(hash, action.py_callable, set())
+    _update_structural_digest(hash, action.args, {})
+    _update_structural_digest(hash, action.kwargs, {})
     return hash.hexdigest()
 
+def _update_structural_digest(hash, value, memo):
+    """ Update hash with the structure and content of value, without pickling
+        it. Objects are described by their type and their state, objects which
+        were already visited (stored in memo) are only referenced.
+    """
+    
+    if id(value) in memo:
+        hash.update("@{}".format(memo[id(value)][0]).encode())
+        return
+    
+    type_ = type(value)
+    hash.update("{}.{}:".format(type_.__module__, type_.__qualname__).encode())
+    
+    if value is None or isinstance(value, (bool, int, float, complex)):
+        hash.update(repr(value).encode())
+        return
+    elif isinstance(value, (str, pathlib.PurePath)):
+        value = str(value).encode()
+        hash.update("{}:".format(len(value)).encode())
+        hash.update(value)
+        return
+    elif isinstance(value, (bytes, bytearray)):
+        hash.update("{}:".format(len(value)).encode())
+        hash.update(value)
+        return
+    
+    # NOTE: keep the visited objects alive, so that the id of a temporary
+    # object (e.g. the state of an object) is not re-used by another object
+    memo[id(value)] = (len(memo), value)
+    
+    if isinstance(value, (list, tuple)):
+        hash.update("{}:".format(len(value)).encode())
+        for item in value:
+            _update_structural_digest(hash, item, memo)
+    elif isinstance(value, dict):
+        hash.update("{}:".format(len(value)).encode())
+        for key, item in value.items():
+            _update_structural_digest(hash, key, memo)
+            _update_structural_digest(hash, item, memo)
+    elif isinstance(value, (set, frozenset)):
+        # Order of items is not deterministic: sort their digests
+        digests = []
+        for item in value:
+            item_hash = hashlib.sha1()
+            _update_structural_digest(item_hash, item, {})
+            digests.append(item_hash.digest())
+        hash.update("{}:".format(len(value)).encode())
+        for digest in sorted(digests):
+            hash.update(digest)
+    elif hasattr(value, "dtype") and hasattr(value, "tobytes"):
+        # NumPy array or scalar
+        hash.update(str(value.dtype).encode())
+        hash.update(str(getattr(value, "shape", ())).encode())
+        hash.update(value.tobytes())
+    elif callable(value) and hasattr(value, "__qualname__"):
+        # Functions and classes are pickled by reference
+        hash.update(
+            "{}.{}".format(
+                getattr(value, "__module__", None), value.__qualname__).encode())
+    else:
+        getstate = getattr(value, "__getstate__", None)
+        state = (
+            getstate() if getstate is not None
+            else getattr(value, "__dict__", None))
+        if state is None:
+            hash.update(pickle.dumps(value))
+        else:
+            _update_structural_digest(hash, state, memo)
+
+def _update_ast_digest(hash, node):
+    """ Update hash with an AST, using only the type of the nodes and their
+        non-empty fields: unlike ast.dump, this does not depend on the Python
+        version (e.g. empty type_params since Python 3.12).
+    """
+    
+    if isinstance(node, ast.AST):
+        hash.update("{}(".format(type(node).__name__).encode())
+        for name in node._fields:
+            value = getattr(node, name, None)
+            if value is None or (isinstance(value, list) and not value):
+                continue
+            hash.update("{}=".format(name).encode())
+            _update_ast_digest(hash, value)
+        hash.update(b")")
+    elif isinstance(node, list):
+        hash.update("[{}:".format(len(node)).encode())
+        for item in node:
+            _update_ast_digest(hash, item)
+        hash.update(b"]")
+    else:
+        hash.update("{}:{!r}".format(type(node).__name__, node).encode())
+
+# Digest of each code object, along with the code object to keep it alive
+_code_digests = {}
+
+def _code_digest(code):
+    """ Return the digest of a code object, based on the AST of its source so
+        that it does not depend on the bytecode of the Python version. The
+        decorators of a function are not included. If the source is not
+        available, the bytecode and constants are used.
+    """
+    
+    entry = _code_digests.get(id(code))
+    if entry is not None and entry[0] is code:
+        return entry[1]
+    
+    hash = hashlib.sha1()
+    try:
+        source = textwrap.dedent(inspect.getsource(code))
+        tree = ast.parse(source)
+        # NOTE: the source of a decorated function includes its decorators,
+        # e.g. the parameters of spire.task_factory
+        for node in tree.body[:1]:
+            if hasattr(node, "decorator_list"):
+                node.decorator_list = []
+        _update_ast_digest(hash, tree)
+    except (OSError, TypeError, SyntaxError):
+        # No source (e.g. interactive session), or source of a lambda which
+        # cannot be parsed out of context
+        codes = [code]
+        while codes:
+            code_ = codes.pop()
+            hash.update(code_.co_code)
+            hash.update(repr(code_.co_names).encode())
+            for constant in code_.co_consts:
+                if isinstance(constant, types.CodeType):
+                    codes.append(constant)
+                else:
+                    hash.update(repr(constant).encode())
+    digest = hash.hexdigest()
+    
+    _code_digests[id(code)] = (code, digest)
+    return digest
+
+def _get_names(code):
+    """ Return the global names used by a code object and its nested code
+        objects.
+    """
+    
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names.update(_get_names(constant))
+    return names
+
+def _update_function_digest(hash, function, visited):
+    """ Update hash with the code, default values and closure of function and,
+        if follow_references is True, of the functions from the same package
+        that it references. The code objects in visited are skipped.
+    """
+    
+    function = getattr(function, "__func__", function)
+    code = getattr(function, "__code__", None)
+    if code is None:
+        # Callable object, not a function
+        _update_structural_digest(hash, function, {})
+        return
+    
+    if id(code) in visited:
+        return
+    visited.add(id(code))
+    
+    hash.update(_code_digest(code).encode())
+    _update_structural_digest(hash, function.__defaults__, {})
+    _update_structural_digest(hash, function.__kwdefaults__, {})
+    
+    package = (function.__module__ or "").split(".")[0]
+    in_package = lambda x: (
+        follow_references and inspect.isfunction(x)
+        and (x.__module__ or "").split(".")[0] == package)
+    
+    for cell in function.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:
+            # Empty cell
+            hash.update(b"<empty>")
+            continue
+        if in_package(contents):
+            _update_function_digest(hash, contents, visited)
+        else:
+            _update_structural_digest(hash, contents, {})
+    
+    if follow_references:
+        for name in sorted(_get_names(code)):
+            value = function.__globals__.get(name)
+            if in_package(value):
+                hash.update(name.encode())
+                _update_function_digest(hash, value, visited)
+
 _digest = {
     doit.action.CmdAction: _command_digest,
     doit.action.PythonAction: _python_digest
 }
 
+def _get_digest(action):
+    """ Return the digest of an action, computed only once per action object.
+    """
+    
+    digest = getattr(action, "_spire_digest", None)
+    if digest is None:
+        digest = _digest[type(action)](action)
+        action._spire_digest = digest
+    return digest
+
 def _check(task, values):
-    digests = [_digest[type(action)](action) for action in task.actions]
+    digests = [_get_digest(action) for action in task.actions]
     task.value_savers.append(lambda: {"actions_hash": digests})
     return values.get("actions_hash", None) == digests
 
 def uptodate(self):
     return [_check]
 
+class HashCache(object):
+    """ Persistent cache of the content digests of files, stored in a SQLite
+        database. A digest is re-used as long as the inode, size and
+        modification time of the file are unchanged, and recomputed otherwise.
+        
+        New digests are written to the database in batches of flush_size
+        entries, and when the cache is flushed or closed.
+    """
+    
+    #: Size of the blocks read when computing a digest
+    block_size = 2**20
+    
+    #: Number of new digests written to the database at once
+    flush_size = 1000
+    
+    #: Time, in seconds, spent waiting for the database to be unlocked by
+    #: another process
+    timeout = 60
+    
+    def __init__(self, path):
+        # NOTE: sqlite3 is imported on first use to reduce the import time
+        import sqlite3
+        
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=self.timeout)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+                "path TEXT PRIMARY KEY, inode INTEGER, size INTEGER, "
+                "mtime INTEGER, digest TEXT)")
+        self._connection.commit()
+        
+        # Load all the entries at once: this is faster than one query per file
+        self._entries = {
+            path: ((inode, size, mtime), digest)
+            for path, inode, size, mtime, digest in self._connection.execute(
+                "SELECT path, inode, size, mtime, digest FROM digests")}
+        # Entries not yet written to the database
+        self._pending = []
+    
+    def get_digest(self, path, stat=None):
+        """ Return the digest of the file, hashing it only if its stat changed
+            since the last call. stat, if specified, must be the result of
+            os.stat(path).
+        """
+        
+        if stat is None:
+            stat = os.stat(path)
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        
+        with open(path, "rb") as fd:
+            hash = hashlib.blake2b()
+            for block in iter(lambda: fd.read(self.block_size), b""):
+                hash.update(block)
+        digest = hash.hexdigest()
+        
+        self._entries[path] = (key, digest)
+        self._pending.append((path, *key, digest))
+        if len(self._pending) >= self.flush_size:
+            self.flush()
+        
+        return digest
+    
+    def flush(self):
+        """ Write the new digests to the database, in a single transaction. """
+        
+        if self._pending:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?)",
+                    self._pending)
+            self._pending = []
+    
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+class HashChecker(doit.dependency.FileChangedChecker):
+    """ Content-based checker for file_dep: the digests are computed with a fast
+        hash and shared by all tasks through a persistent HashCache, so that
+        unmodified files are only stat'ed. This checker is enabled in a tasks
+        file with
+        
+        >>> DOIT_CONFIG = {"check_file_uptodate": spire.HashChecker}
+        
+        The cache is stored in the doit working directory; derive this class and
+        set cache_path to change its location.
+    """
+    
+    cache_path = ".spire-hashes.sqlite3"
+    
+    def __init__(self):
+        self.cache = HashCache(self.cache_path)
+        # NOTE: doit does not close its checker, write the remaining digests
+        # when the program ends
+        atexit.register(self.cache.close)
+    
+    def check_modified(self, file_path, file_stat, state):
+        return state != self.cache.get_digest(file_path, file_stat)
+    
+    def get_state(self, dep, current_state):
+        digest = self.cache.get_digest(dep)
+        return None if digest == current_state else digest
+
+def path_key(path, root=None):
+    """ Return a canonical representation of path, suitable for comparisons
+        and hashed lookups: str and pathlib.Path objects are converted to the
+        same normalized and interned string. If root is specified, relative
+        paths are resolved against it.
+    """
+    
+    # Keep empty paths, used by Spire for missing dependencies
+    if not path:
+        return ""
+    return _path_key(os.fspath(path), root)
+
+@functools.lru_cache(maxsize=2**16)
+def _path_key(path, root):
+    if root is not None:
+        path = os.path.join(root, path)
+    return sys.intern(os.path.normpath(path))
+
 class classproperty(object):
     def __init__(self, fget):
         self.fget = fget
@@ -0,0 +1,154 @@
+import logging
+import os
+
+def _target_key(path):
+    """ Return the key of a target in the index of a registry, i.e. its
+        normalized path. Unlike misc.path_key, keys are neither interned nor
+        memoized, and normalized paths are used as is, so that the index does
+        not store a copy of each target.
+    """
+    
+    path = os.fspath(path)
+    key = os.path.normpath(path) if path else path
+    return path if key == path else key
+
+class Registry(object):
+    """ Collection of TaskFactory objects, which can be looked up by basename.
+        
+        TaskFactory objects are added to the current registry on creation. The
+        current registry is the default one, unless another registry is used as
+        a context manager:
+        
+        >>> with spire.Registry() as registry:
+        ...     houses = [BuildHouse(x) for x in ["Straw", "Sticks", "Bricks"]]
+        ...     # Run doit here: only the tasks of registry will be loaded
+        
+        Once the registry is discarded, its objects can be garbage-collected.
+        
+        Objects sharing a basename and targets produced by several objects are
+        detected when they are registered: in strict mode, an exception is
+        raised, otherwise a warning is logged and the duplicates are stored in
+        the duplicates member, as (kind, name, first object, second object),
+        kind being either "basename" or "target".
+    """
+    
+    # Stack of current registries, the default one being the first one
+    _stack = []
+    
+    def __init__(self, strict=False):
+        self.strict = strict
+        self.duplicates = []
+        
+        # Objects, by id, in the order they were added
+        self._objects = {}
+        # Objects, by basename
+        self._basenames = {}
+        # Objects, by target path
+        self._producers = {}
+        # Objects, their state and the doit task created from them, by id of
+        # the object
+        self.doit_tasks = {}
+        # Task graphs of modules, along with the state they were created in
+        self.graphs = {}
+        # Incremented each time the registry is modified
+        self.version = 0
+    
+    @staticmethod
+    def current():
+        """ Return the current registry. """
+        return Registry._stack[-1]
+    
+    def add(self, object_):
+        basename = str(object_.basename)
+        if basename in self._basenames:
+            self._add_duplicate(
+                "basename", basename, self._basenames[basename], object_)
+        
+        self._objects[id(object_)] = object_
+        self._basenames[basename] = object_
+        self.add_targets(object_)
+        self.version += 1
+    
+    def remove(self, object_):
+        if self._objects.get(id(object_)) is not object_:
+            raise ValueError("{} is not registered".format(object_.basename))
+        
+        self.remove_targets(object_)
+        del self._objects[id(object_)]
+        if self._basenames.get(str(object_.basename)) is object_:
+            del self._basenames[str(object_.basename)]
+        self.doit_tasks.pop(id(object_), None)
+        # Do not keep references to the removed object
+        self.duplicates = [
+            x for x in self.duplicates
+            if x[2] is not object_ and x[3] is not object_]
+        self.graphs.clear()
+        self.version += 1
+    
+    def add_targets(self, object_):
+        """ Add the targets of an object to the index of targets. In strict
+            mode, the index is not modified if a target is a duplicate.
+        """
+        
+        keys = [_target_key(x) for x in getattr(object_, "targets", None) or []]
+        if self.strict:
+            for key in keys:
+                producer = self._producers.get(key)
+                if producer is not None and producer is not object_:
+                    self._add_duplicate("target", key, producer, object_)
+        
+        for key in keys:
+            producer = self._producers.setdefault(key, object_)
+            if producer is not object_:
+                self._add_duplicate("target", key, producer, object_)
+    
+    def remove_targets(self, object_):
+        """ Remove the targets of an object from the index of targets. """
+        
+        for target in getattr(object_, "targets", None) or []:
+            key = _target_key(target)
+            if self._producers.get(key) is object_:
+                del self._producers[key]
+    
+    def producer_of(self, path):
+        """ Return the object producing path. """
+        return self._producers.get(_target_key(path))
+    
+    def clear(self):
+        self._objects.clear()
+        self._basenames.clear()
+        self._producers.clear()
+        self.doit_tasks.clear()
+        self.graphs.clear()
+        self.duplicates.clear()
+        self.version += 1
+    
+    def get(self, basename, default=None):
+        """ Return the object with given basename. """
+        return self._basenames.get(str(basename), default)
+    
+    def _add_duplicate(self, kind, name, first, second):
+        message = "Duplicate {} {}: {} and {}".format(
+            kind, name, first.basename, second.basename)
+        if self.strict:
+            raise Exception(message)
+        logging.warning(message)
+        self.duplicates.append((kind, name, first, second))
+    
+    def __contains__(self, object_):
+        return self._objects.get(id(object_)) is object_
+    
+    def __iter__(self):
+        return iter(self._objects.values())
+    
+    def __len__(self):
+        return len(self._objects)
+    
+    def __enter__(self):
+        Registry._stack.append(self)
+        return self
+    
+    def __exit__(self, *args):
+        Registry._stack.remove(self)
+
+Registry._stack.append(Registry())
@@ -0,0 +1,224 @@
+import os
+import queue
+import threading
+
+import doit.cmd_run
+import doit.doit_cmd
+import doit.runner
+
+# Multipliers of the memory units
+_units = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+def parse_memory(value):
+    """ Return the number of bytes of a memory size, given either as a number
+        of bytes or as a string with an optional unit (e.g. "512M", "4G").
+    """
+    
+    if isinstance(value, str):
+        value = value.strip().upper().rstrip("B")
+        unit = value[-1:] if value[-1:] in _units else ""
+        return int(float(value[:len(value)-len(unit)]) * _units[unit])
+    else:
+        return int(value)
+
+def get_physical_memory():
+    """ Return the physical memory of the machine in bytes, or None if it
+        cannot be determined.
+    """
+    
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+class Runner(doit.runner.Runner):
+    """ doit runner executing tasks in parallel threads, so that the resources
+        required by the running tasks stay within the limits of the machine.
+        
+        The requirements of a task are read from the "resources" entry of its
+        meta-data (cf. TaskFactory.resources), a mapping which may contain:
+        
+        - cpus: number of CPUs used by the task (default: 1),
+        - memory: memory used by the task, in bytes or as a string with a unit
+          (default: 0),
+        - exclusive: tags of resources which can be used by a single task at a
+          time, e.g. a software license (default: none).
+        
+        A task requiring more than the limits of the runner is run when no other
+        task is running.
+    """
+    
+    def __init__(
+            self, dep_manager, reporter, continue_=False, always_execute=False,
+            stream=None, cpus=None, memory=None):
+        doit.runner.Runner.__init__(
+            self, dep_manager, reporter, continue_, always_execute, stream)
+        
+        self.cpus = cpus if cpus is not None else os.cpu_count()
+        self.memory = (
+            parse_memory(memory) if memory is not None
+            else get_physical_memory())
+        
+        # Resources which are currently not used by a task
+        self._free_cpus = self.cpus
+        self._free_memory = self.memory
+        self._locked = set()
+    
+    def get_requirements(self, task):
+        """ Return the CPUs, memory and exclusive tags required by a task,
+            limited to the resources of the runner.
+        """
+        
+        resources = (task.meta or {}).get("resources") or {}
+        
+        cpus = min(resources.get("cpus", 1), self.cpus)
+        memory = parse_memory(resources.get("memory", 0))
+        if self.memory is not None:
+            memory = min(memory, self.memory)
+        exclusive = resources.get("exclusive", ())
+        if isinstance(exclusive, str):
+            exclusive = [exclusive]
+        
+        return cpus, memory, frozenset(exclusive)
+    
+    def run_tasks(self, task_dispatcher):
+        # Nodes selected for execution, waiting for resources
+        pending = []
+        # Nodes processed by the runner, to be sent back to the dispatcher
+        completed = []
+        # Results of the running tasks
+        results = queue.Queue()
+        running = 0
+        exhausted = False
+        
+        while True:
+            # Get the ready tasks from the dispatcher
+            while not exhausted and not self._stop_running:
+                try:
+                    node = task_dispatcher.generator.send(
+                        completed.pop() if completed else None)
+                except StopIteration:
+                    exhausted = True
+                    break
+                
+                if node == "hold on":
+                    if completed:
+                        continue
+                    else:
+                        # Wait for a running task to finish
+                        break
+                elif self.select_task(node, task_dispatcher.tasks):
+                    pending.append(node)
+                else:
+                    completed.append(node)
+            
+            # Start the pending tasks, in order, as long as resources are
+            # available
+            for node in list(pending):
+                if self._stop_running:
+                    break
+                requirements = self.get_requirements(node.task)
+                if self._acquire(requirements):
+                    pending.remove(node)
+                    self._start(node, requirements, results)
+                    running += 1
+            
+            if running == 0:
+                break
+            
+            node, requirements, failure, exception = results.get()
+            running -= 1
+            self._release(requirements)
+            if exception is not None:
+                raise exception
+            self.process_task_result(node, failure)
+            completed.append(node)
+    
+    def _acquire(self, requirements):
+        """ Reserve the resources required by a task, return whether they were
+            available.
+        """
+        
+        cpus, memory, exclusive = requirements
+        
+        if (
+                cpus > self._free_cpus
+                or (self._free_memory is not None and memory > self._free_memory)
+                or not self._locked.isdisjoint(exclusive)):
+            return False
+        
+        self._free_cpus -= cpus
+        if self._free_memory is not None:
+            self._free_memory -= memory
+        self._locked.update(exclusive)
+        return True
+    
+    def _release(self, requirements):
+        """ Release the resources required by a task. """
+        
+        cpus, memory, exclusive = requirements
+        
+        self._free_cpus += cpus
+        if self._free_memory is not None:
+            self._free_memory += memory
+        self._locked.difference_update(exclusive)
+    
+    def _start(self, node, requirements, results):
+        """ Execute the task of node in a thread, its result is stored in
+            results.
+        """
+        
+        def target():
+            failure, exception = None, None
+            try:
+                failure = self.execute_task(node.task)
+            except Exception as e:
+                exception = e
+            results.put((node, requirements, failure, exception))
+        
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+
+class Run(doit.cmd_run.Run):
+    """ doit "run" command using the resource-aware runner. """
+    
+    doc_purpose = "run tasks within the resources of the machine"
+    
+    cmd_options = doit.cmd_run.Run.cmd_options + (
+        {
+            "name": "cpus", "long": "cpus", "type": int, "default": None,
+            "help": "Number of CPUs available to the tasks "
+                "[default: all CPUs]"},
+        {
+            "name": "memory", "long": "memory", "type": str, "default": None,
+            "help": "Memory available to the tasks, e.g. 16G "
+                "[default: physical memory]"},
+    )
+    
+    def _execute(
+            self, outfile, verbosity=None, always=False, continue_=False,
+            reporter="console", num_process=0, par_type="process",
+            single=False, auto_delayed_regex=False, force_verbosity=False,
+            failure_verbosity=0, pdb=False, cpus=None, memory=None):
+        # NOTE: doit creates its sequential runner from the name "Runner" of
+        # the cmd_run module: substitute the Spire runner for this call. The
+        # num_process and par_type options are ignored.
+        def runner(*args):
+            return Runner(*args, cpus=cpus, memory=memory)
+        
+        original = doit.cmd_run.Runner
+        doit.cmd_run.Runner = runner
+        try:
+            return doit.cmd_run.Run._execute(
+                self, outfile, verbosity, always, continue_, reporter, 0,
+                par_type, single, auto_delayed_regex, force_verbosity,
+                failure_verbosity, pdb)
+        finally:
+            doit.cmd_run.Runner = original
+
+class DoitMain(doit.doit_cmd.DoitMain):
+    """ doit application using the resource-aware "run" command. """
+    
+    DOIT_CMDS = tuple(
+        Run if x is doit.cmd_run.Run else x
+        for x in doit.doit_cmd.DoitMain.DOIT_CMDS)
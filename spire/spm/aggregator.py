@@ -0,0 +1,145 @@
+import atexit
+import itertools
+import os
+import tempfile
+import threading
+import time
+
+from . import utils, worker
+
+class Aggregator(object):
+    """ Run the jobs of concurrent calls to spire.spm.utils.run in a single
+        MATLAB session (cf. utils.get_batch_script).
+        
+        When the tasks are run in parallel (e.g. by spire.runner.Runner or by
+        "doit run -n N -P thread"), the SPM jobs which are ready at the same
+        time are aggregated: the first call waits for other calls during delay
+        seconds, or until size calls are waiting, then runs all their jobs. Each
+        call only fails if its own jobs fail. The batch is run by a worker if a
+        worker pool is active (cf. worker.Pool), otherwise by a new MATLAB
+        process.
+        
+        >>> with Aggregator(delay=5, size=50):
+        ...     # Run doit here
+    """
+    
+    # Stack of active aggregators
+    _stack = []
+    
+    def __init__(self, delay=1, size=None, matlab="matlab", modality="fmri"):
+        self.delay = delay
+        self.size = size
+        self.matlab = matlab
+        self.modality = modality
+        
+        self._condition = threading.Condition()
+        # Calls waiting for the next batch
+        self._waiting = []
+        # Whether the next batch is being collected
+        self._collecting = False
+    
+    @staticmethod
+    def current():
+        """ Return the current aggregator, or None if none is active. """
+        return Aggregator._stack[-1] if Aggregator._stack else None
+    
+    def activate(self):
+        """ Make this aggregator the current one, until it is closed. """
+        
+        Aggregator._stack.append(self)
+        atexit.register(self.close)
+    
+    def close(self):
+        """ Deactivate the aggregator. """
+        
+        if self in Aggregator._stack:
+            Aggregator._stack.remove(self)
+        atexit.unregister(self.close)
+    
+    def __enter__(self):
+        self.activate()
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+    
+    def run(self, jobs):
+        """ Run a list of jobs along with the jobs of concurrent calls, raise
+            an exception if the jobs failed.
+        """
+        
+        call = {
+            "jobs": jobs, "done": threading.Event(),
+            "error": Exception("SPM job did not run")}
+        with self._condition:
+            self._waiting.append(call)
+            leader = not self._collecting
+            self._collecting = True
+            self._condition.notify_all()
+            
+            if leader:
+                # Wait for other calls
+                deadline = time.monotonic() + self.delay
+                while self.size is None or len(self._waiting) < self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                
+                batch, self._waiting = self._waiting, []
+                self._collecting = False
+        
+        if leader:
+            try:
+                self._run_batch(batch)
+            finally:
+                for call in batch:
+                    call["done"].set()
+        
+        call["done"].wait()
+        if call["error"] is not None:
+            raise call["error"]
+    
+    def _run_batch(self, batch):
+        """ Run the jobs of several calls, and store their errors. """
+        
+        fd, status_path = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+        
+        jobs_list = [call["jobs"] for call in batch]
+        error = None
+        try:
+            pool = worker.Pool.current()
+            if pool is not None:
+                pool.run(
+                    itertools.chain(
+                        ["cd {}; ".format(os.getcwd())],
+                        utils.iter_batch_script(
+                            jobs_list, status_path, standalone=False)))
+            else:
+                utils.run_script(
+                    utils.iter_batch_script(
+                        jobs_list, status_path, modality=self.modality),
+                    self.matlab)
+        except Exception as e:
+            # Jobs which did not report their status failed because of e
+            error = e
+        
+        statuses = {}
+        try:
+            with open(status_path) as fd:
+                for line in fd:
+                    index, status = line.split()
+                    statuses[int(index)] = int(status)
+        finally:
+            os.remove(status_path)
+        
+        for index, call in enumerate(batch):
+            status = statuses.get(index)
+            if status is None:
+                call["error"] = Exception(
+                    "SPM job did not run: {}".format(error))
+            elif status != 0:
+                call["error"] = Exception("SPM job failed")
+            else:
+                call["error"] = None
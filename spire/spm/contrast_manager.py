@@ -1,8 +1,6 @@
 import itertools
 import textwrap
 
-import numpy
-
 from .spm_object import SPMObject
 
 class Contrast(object):
@@ -10,6 +8,9 @@ class Contrast(object):
     """
     
     def __init__(self, name, weights, replication="none"):
+        # NOTE: numpy is imported on first use to reduce the import time
+        import numpy
+        
         self.name = name
         self.weights = numpy.asarray(weights)
         if len(self.weights.shape) > 1:
@@ -63,6 +64,8 @@ class ContrastManager(SPMObject):
     def _get_targets(self):
         targets = [self.design.spmmat]
         
+        import numpy
+        
         directory = self.design.spmmat.parent
         for index, contrast in enumerate(self.contrasts):
             type_ = "F" if numpy.squeeze(contrast.weights).ndim > 1 else "T"
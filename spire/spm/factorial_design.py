@@ -279,26 +279,18 @@ class FactorialDesign(SPMObject):
     
         self.template = textwrap.dedent("""\
             {{ id(index, name) }}.dir = {'{{ output_directory }}'};
-            {{ _design }}
-            {{ _covariates }}
+            {% for x in design.iter_script(index) %}{{ x }}{% endfor %}
+            {% for x in covariates.iter_script(index) %}{{ x }}{% endfor %}
             {{ id(index, name) }}.multi_cov = struct('files', {}, 'iCFI', {}, 'iCC', {});
-            {{ _masking }}
-            {{ _global_calculation }}
-            {{ _global_normalization }}
+            {% for x in masking.iter_script(index) %}{{ x }}{% endfor %}
+            {% for x in global_calculation.iter_script(index) %}{{ x }}{% endfor %}
+            {% for x in global_normalization.iter_script(index) %}{{ x }}{% endfor %}
             """)
     
     @property
     def spmmat(self):
         return pathlib.Path(self.output_directory)/"SPM.mat"
     
-    def get_script(self, index):
-        self._design = self.design.get_script(index)
-        self._covariates = self.covariates.get_script(index)
-        self._masking = self.masking.get_script(index)
-        self._global_calculation = self.global_calculation.get_script(index)
-        self._global_normalization = self.global_normalization.get_script(index)
-        return SPMObject.get_script(self, index)
-    
     def _get_file_dep(self):
         return list(itertools.chain(self.design.file_dep, self.masking.file_dep))
     
@@ -1,4 +1,61 @@
-import jinja2
+import hashlib
+import os
+
+from . import utils
+
+#: Cache the compiled templates on disk, in the cache directory of the user
+#: (cf. utils.get_cache_directory), so that they are shared by processes. This
+#: must be set before the first template is rendered.
+use_bytecode_cache = False
+
+# Jinja environment shared by all SPM objects, created on first use
+_environment = None
+# Source of the templates, by name in the environment
+_sources = {}
+# Compiled templates, by source
+_templates = {}
+
+def get_environment():
+    """ Return the Jinja environment shared by all SPM objects, created on
+        first use so that jinja2 is not imported when only the task graph is
+        required. If use_bytecode_cache is True, the compiled templates are
+        also cached on disk.
+    """
+    
+    global _environment
+    if _environment is None:
+        import jinja2
+        
+        bytecode_cache = None
+        if use_bytecode_cache:
+            try:
+                directory = os.path.join(utils.get_cache_directory(), "jinja2")
+                os.makedirs(directory, exist_ok=True)
+                bytecode_cache = jinja2.FileSystemBytecodeCache(directory)
+            except OSError:
+                pass
+        
+        # NOTE: templates are identified by the digest of their source, and
+        # never change
+        environment = jinja2.Environment(
+            loader=jinja2.FunctionLoader(_sources.get),
+            bytecode_cache=bytecode_cache, auto_reload=False)
+        environment.globals.update(id=SPMObject._get_id)
+        _environment = environment
+    return _environment
+
+def get_template(source):
+    """ Return the template compiled from source, compiling it only on the
+        first call.
+    """
+    
+    template = _templates.get(source)
+    if template is None:
+        name = hashlib.sha1(source.encode()).hexdigest()
+        _sources[name] = source
+        template = get_environment().get_template(name)
+        _templates[source] = template
+    return template
 
 class SPMObject(object):
     """ Abstract Base Class for all SPM objects.
@@ -12,12 +69,24 @@ class SPMObject(object):
     
     def __init__(self, name):
         self.name = name
-        self.environment = jinja2.Environment()
-        self.environment.globals.update(id=__class__._get_id)
+    
+    @property
+    def environment(self):
+        """ Jinja environment shared by all SPM objects (cf. get_environment).
+        """
+        
+        return get_environment()
     
     def get_script(self, index):
-        template = self.environment.from_string(self.template)
-        return template.render(index=index, **vars(self))
+        return "".join(self.iter_script(index))
+    
+    def iter_script(self, index):
+        """ Yield the parts of the script of the object, without rendering it
+            in memory.
+        """
+        
+        template = get_template(self.template)
+        return template.generate(index=index, **vars(self))
     
     @property
     def file_dep(self):
@@ -36,13 +105,4 @@ class SPMObject(object):
     
     def _get_targets(self):
         return []
-    
-    def __getstate__(self):
-        state = self.__dict__.copy()
-        del state["environment"]
-        return state
-    
-    def __setstate__(self, state):
-        self.__dict__.update(state)
-        self.environment = jinja2.Environment()
-        self.environment.globals.update(id=__class__._get_id)
+
@@ -1,33 +1,96 @@
+import itertools
+import json
 import os
+import shutil
 import subprocess
 import tempfile
 
-def find(matlab="matlab", matlab_path=None):
+from . import aggregator, worker
+
+def find(matlab="matlab", matlab_path=None, refresh=False):
     """ Return the root directory of SPM. matlab, if given, is the path to the
         MATLAB executable. matlab_path, if given, is a MATLAB expression fed to
         addpath.
+        
+        The environment variable SPIRE_SPM_DIR, if set, is returned without
+        running MATLAB. Otherwise, the result is cached (cf. get_find_cache),
+        based on the path and modification time of the MATLAB executable and
+        on matlab_path; refresh ignores the cached result.
+    """
+    
+    if os.environ.get("SPIRE_SPM_DIR"):
+        return os.environ["SPIRE_SPM_DIR"]
+    
+    # Key in the cache, None if the executable cannot be found
+    key = None
+    executable = shutil.which(matlab)
+    if executable is not None:
+        executable = os.path.realpath(executable)
+        key = json.dumps(
+            [executable, os.stat(executable).st_mtime_ns, matlab_path])
+    
+    cache_path = get_find_cache()
+    try:
+        with open(cache_path) as fd:
+            cache = json.load(fd)
+    except (OSError, ValueError):
+        cache = {}
+    
+    root = cache.get(key)
+    if refresh or root is None or not os.path.isdir(root):
+        root = _find(matlab, matlab_path)
+        if key is not None:
+            cache[key] = root
+            # NOTE: write to a temporary file so that concurrent readers never
+            # see a partial cache
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            fd, path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+            with os.fdopen(fd, "w") as file_:
+                json.dump(cache, file_)
+            os.replace(path, cache_path)
+    
+    return root
+
+def get_find_cache():
+    """ Return the path to the cache of find, in the cache directory of the
+        user. Removing this file invalidates the cache.
     """
     
+    return os.path.join(get_cache_directory(), "spm.json")
+
+def get_cache_directory():
+    """ Return the cache directory of Spire, in the cache directory of the
+        user.
+    """
+    
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"),
+        "spire")
+
+def _find(matlab, matlab_path):
+    """ Return the root directory of SPM, as printed by MATLAB. """
+    
     script = ("if isempty(which('spm'));"
               "fprintf(1, '');"
               "exit();"
               "end;"
               "fprintf(1, '%s', spm('dir'));"
               "exit();")
-
+    
     if matlab_path:
         script = "addpath({});".format(matlab_path)+script
-
+    
     try:
         output = subprocess.check_output([
             matlab, "-nodisplay", "-nosplash", "-nojvm", "-r", script])
-    except subprocess.CalledProcessError as e:
+    except (OSError, subprocess.CalledProcessError) as e:
         raise Exception("Could not find SPM: {}".format(e))
-    last_line = output.splitlines()[-1]
+    last_line = output.splitlines()[-1] if output else b""
     # Weird data at the end of the line
     if b"\x1b" in last_line :
         last_line = last_line[:last_line.index(b"\x1b")]
-    if last_line == "" :
+    if not last_line:
         raise Exception("Could not find SPM")
     
     return last_line.decode()
@@ -39,35 +102,133 @@ def get_script(tools, standalone=True, exit=True, modality="fmri"):
         the resulting script can be loaded in SPM Batch Editor.
     """
     
-    script = []
+    return "".join(iter_script(tools, standalone, exit, modality))
+
+def iter_script(tools, standalone=True, exit=True, modality="fmri"):
+    """ Yield the parts of the script returned by get_script, without rendering
+        it in memory.
+    """
+    
+    def items():
+        if standalone:
+            yield "spm('defaults','{}');".format(modality)
+            yield "spm_jobman('initcfg');"
+        
+        for index, tool in enumerate(tools):
+            yield tool.iter_script(1+index)
+        
+        if standalone:
+            yield "spm_jobman('run',matlabbatch);"
+            if exit:
+                yield "exit();"
+    
+    return _join_lines(items())
+
+def write_script(fd, tools, standalone=True, exit=True, modality="fmri"):
+    """ Write the script returned by get_script to a file object, without
+        rendering it in memory.
+    """
     
-    if standalone:
-        script.extend([
-            "spm('defaults','{}');".format(modality),
-            "spm_jobman('initcfg');"
-        ])
+    fd.writelines(iter_script(tools, standalone, exit, modality))
+
+def get_batch_script(
+        jobs_list, status_path, standalone=True, exit=True, modality="fmri"):
+    """ Return a Matlab script running several lists of jobs in a single
+        batch: the steps of all jobs are re-indexed in matlabbatch, and each
+        list of jobs is run separately, so that a failure only affects its own
+        list. The index of each list, followed by its status (0 on success),
+        is appended to status_path. If standalone is True, the script includes
+        SPM initialization commands.
+    """
     
-    for index, tool in enumerate(tools):
-        script.append(tool.get_script(1+index))
+    return "".join(
+        iter_batch_script(jobs_list, status_path, standalone, exit, modality))
+
+def iter_batch_script(
+        jobs_list, status_path, standalone=True, exit=True, modality="fmri"):
+    """ Yield the parts of the script returned by get_batch_script, without
+        rendering it in memory.
+    """
     
-    if standalone:
-        script.append("spm_jobman('run',matlabbatch);")
-        if exit:
-            script.append("exit();")
+    def items():
+        if standalone:
+            yield "spm('defaults','{}');".format(modality)
+            yield "spm_jobman('initcfg');"
+        
+        # Range of steps of each list of jobs in the batch
+        ranges = []
+        index = 1
+        for jobs in jobs_list:
+            ranges.append((index, index+len(jobs)-1))
+            for tool in jobs:
+                yield tool.iter_script(index)
+                index += 1
+        
+        for list_index, (first, last) in enumerate(ranges):
+            yield (
+                "try;spm_jobman('run',matlabbatch({}:{}));spire_status=0;"
+                "catch spire_error;fprintf(2,'%s\\n',spire_error.message);"
+                "spire_status=1;end;".format(first, last))
+            yield (
+                "spire_fid=fopen('{}','a');"
+                "fprintf(spire_fid,'%d %d\\n',{},spire_status);"
+                "fclose(spire_fid);".format(status_path, list_index))
+        
+        if standalone and exit:
+            yield "exit();"
     
-    return "\n".join(script)
+    return _join_lines(items())
 
 def run(jobs, matlab="matlab"):
     """ Run a list of jobs in Matlab. The ``matlab`` argument, if specified,
-        is the path to the MATLAB executable.
+        is the path to the MATLAB executable. If an aggregator is active (cf.
+        aggregator.Aggregator), the jobs are run along with other jobs. If a
+        worker pool is active (cf. worker.Pool), the jobs are run by one of its
+        workers.
     """
     
-    fd, path = tempfile.mkstemp(suffix=".m")
-    os.write(fd, "cd {}; {}".format(os.getcwd(), get_script(jobs)).encode())
-    os.close(fd)
+    aggregator_ = aggregator.Aggregator.current()
+    if aggregator_ is not None:
+        aggregator_.run(jobs)
+        return
+    
+    pool = worker.Pool.current()
+    if pool is not None:
+        # NOTE: SPM is already initialized in the workers
+        pool.run(
+            itertools.chain(
+                ["cd {}; ".format(os.getcwd())],
+                iter_script(jobs, standalone=False),
+                ["\nspm_jobman('run',matlabbatch);"]))
+        return
+    
+    run_script(iter_script(jobs), matlab)
 
+def run_script(script, matlab="matlab"):
+    """ Run a standalone Matlab script, given as a string or as an iterable of
+        strings, in the current directory, in a new MATLAB process.
+    """
+    
+    fd, path = tempfile.mkstemp(suffix=".m")
+    with os.fdopen(fd, "w") as file_:
+        file_.write("cd {}; ".format(os.getcwd()))
+        file_.writelines([script] if isinstance(script, str) else script)
+    
     try:
         subprocess.check_call([
             matlab, "-nodisplay", "-nosplash", "-r", "run('{}');".format(path)])
     finally:
         os.remove(path)
+
+def _join_lines(items):
+    """ Yield the items, strings or iterables of strings, separated by new
+        lines.
+    """
+    
+    for position, item in enumerate(items):
+        if position > 0:
+            yield "\n"
+        if isinstance(item, str):
+            yield item
+        else:
+            yield from item
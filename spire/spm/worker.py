@@ -0,0 +1,194 @@
+import atexit
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+# Line written by a worker once a script has been run, followed by its status
+sentinel = "__SPIRE_DONE__"
+
+def get_loop(modality="fmri", matlab_path=None):
+    """ Return the MATLAB/Octave code initializing SPM, then running the
+        scripts whose path are read on the standard input, until an empty line
+        or the end of the input. Each script is followed by a line containing
+        the sentinel and the status of the script (0 on success).
+    """
+    
+    loop = [
+        "spm('defaults','{}');".format(modality),
+        "spm_jobman('initcfg');",
+        "while true;",
+        "try;spire_path=input('','s');catch;break;end;",
+        "if isempty(spire_path);break;end;",
+        "try;clear matlabbatch;run(spire_path);spire_status=0;",
+        "catch spire_error;fprintf(2,'%s\\n',spire_error.message);spire_status=1;",
+        "end;",
+        "fprintf(1,'\\n{} %d\\n',spire_status);".format(sentinel),
+        "if exist('OCTAVE_VERSION','builtin');fflush(stdout);end;",
+        "end;",
+        "exit();"]
+    if matlab_path:
+        loop.insert(0, "addpath({});".format(matlab_path))
+    
+    return "".join(loop)
+
+def get_command(
+        engine="matlab", executable=None, modality="fmri", matlab_path=None):
+    """ Return the command starting a worker. engine is either "matlab" or
+        "octave", executable defaults to the name of the engine. matlab_path,
+        if given, is a MATLAB expression fed to addpath.
+    """
+    
+    loop = get_loop(modality, matlab_path)
+    if engine == "matlab":
+        return [executable or "matlab", "-nodisplay", "-nosplash", "-r", loop]
+    elif engine == "octave":
+        return [executable or "octave", "--no-gui", "--quiet", "--eval", loop]
+    else:
+        raise Exception("Unknown engine: {}".format(engine))
+
+class Worker(object):
+    """ MATLAB or Octave process running the scripts it receives on its
+        standard input (cf. get_loop), so that MATLAB is started and SPM is
+        initialized only once.
+    """
+    
+    def __init__(self, command):
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            universal_newlines=True, bufsize=1)
+    
+    def run(self, script):
+        """ Run a script, given as a string or as an iterable of strings, relay
+            its output, and raise an exception if it failed.
+        """
+        
+        fd, path = tempfile.mkstemp(suffix=".m")
+        try:
+            with os.fdopen(fd, "w") as file_:
+                file_.writelines([script] if isinstance(script, str) else script)
+            
+            self.process.stdin.write("{}\n".format(path))
+            self.process.stdin.flush()
+            
+            status = None
+            for line in self.process.stdout:
+                if line.startswith(sentinel):
+                    status = int(line[len(sentinel):])
+                    break
+                sys.stdout.write(line)
+        finally:
+            os.remove(path)
+        
+        if status is None:
+            raise Exception(
+                "Worker exited with code {}".format(self.process.wait()))
+        elif status != 0:
+            raise Exception("Script failed in worker")
+    
+    @property
+    def alive(self):
+        return self.process.poll() is None
+    
+    def close(self):
+        """ Stop the worker, waiting for the end of the current script. """
+        
+        if self.alive:
+            try:
+                self.process.stdin.write("\n")
+                self.process.stdin.close()
+            except OSError:
+                pass
+        self.process.wait()
+
+class Pool(object):
+    """ Pool of workers running SPM scripts, started on first use. While a pool
+        is active, spire.spm.utils.run uses it instead of starting MATLAB for
+        each job:
+        
+        >>> with Pool(get_command("matlab"), size=4):
+        ...     # Run doit here
+        
+        In a tasks file, a pool may instead be activated until the end of the
+        program:
+        
+        >>> Pool(get_command("matlab"), size=4).activate()
+    """
+    
+    # Stack of active pools
+    _stack = []
+    
+    def __init__(self, command, size=1):
+        self.command = command
+        self.size = size
+        
+        self._reset()
+    
+    @staticmethod
+    def current():
+        """ Return the current pool, or None if no pool is active. """
+        return Pool._stack[-1] if Pool._stack else None
+    
+    def activate(self):
+        """ Make this pool the current one, until it is closed. """
+        
+        Pool._stack.append(self)
+        atexit.register(self.close)
+    
+    def run(self, script):
+        """ Run a script in an idle worker, starting a new worker if all the
+            workers are busy and the pool is not full.
+        """
+        
+        if self._pid != os.getpid():
+            # Workers inherited from the parent process (e.g. in doit's
+            # multi-process runner) cannot be shared.
+            self._reset()
+        
+        with self._condition:
+            while not self._idle and len(self._workers) >= self.size:
+                self._condition.wait()
+            if self._idle:
+                worker = self._idle.pop()
+            else:
+                worker = Worker(self.command)
+                self._workers.append(worker)
+        
+        try:
+            worker.run(script)
+        finally:
+            with self._condition:
+                if worker.alive:
+                    self._idle.append(worker)
+                else:
+                    self._workers.remove(worker)
+                self._condition.notify()
+    
+    def close(self):
+        """ Stop the workers and deactivate the pool. """
+        
+        if self._pid == os.getpid():
+            with self._condition:
+                for worker in self._workers:
+                    worker.close()
+        self._reset()
+        
+        if self in Pool._stack:
+            Pool._stack.remove(self)
+        atexit.unregister(self.close)
+    
+    def __enter__(self):
+        self.activate()
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+    
+    def _reset(self):
+        """ Forget the workers of the pool. """
+        
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._workers = []
+        self._idle = []
@@ -32,6 +32,9 @@ TaskBase = type.__new__(TaskMeta, "TaskBase", (), {})
 
 class Task(TaskBase): 
     clean = True
+    
+    # Resources required by the task: cpus, memory and exclusive tags
+    resources = None
 
     @misc.classproperty
     def uptodate(cls):
@@ -46,4 +49,9 @@ class Task(TaskBase):
             return None
         else:
             fields = ["basename", "file_dep", "targets", "actions", "clean", "uptodate"]
-            return {x: getattr(class_, x) for x in fields}
+            dict_ = {x: getattr(class_, x) for x in fields}
+            # Replace None with "" to avoid an error on task creation
+            dict_["file_dep"] = [x or "" for x in dict_["file_dep"]]
+            if class_.resources:
+                dict_["meta"] = {"resources": class_.resources}
+            return dict_
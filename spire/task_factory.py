@@ -1,4 +1,7 @@
+import collections.abc
+
 from . import misc
+from .registry import Registry
 
 class TaskFactory(object):
     """ Base class for task factory objects. Derived classes must follow this
@@ -17,22 +20,146 @@ class TaskFactory(object):
         A task can then be created as such:
         >>> task = MyTask("foo", "bar")
         
-        If the task is not re-used, storing it in an object is not mandatory.
+        If the task is not re-used, storing it in an object is not mandatory: it
+        is added to a registry, by default the current one (cf. Registry).
+        
+        The members of the task are stored in slots; derived classes which do
+        not define __slots__ may nonetheless define other members.
+        
+        The resources required by the task (cpus, memory and exclusive tags)
+        may be declared in the resources member, either for each object or for
+        the whole class. They are used by the Spire runner (cf.
+        spire.runner.Runner).
+        
+        >>> class MyHeavyTask(TaskFactory):
+        ...     resources = {"cpus": 8, "memory": "16G", "exclusive": ["gpu"]}
+        
+        A class-wide declaration hides the slot: objects of a derived class
+        which also defines __slots__ cannot then override it.
     """
     
-    _task_registry = []
+    __slots__ = (
+        "basename", "clean", "file_dep", "_targets", "actions", "skipped",
+        "resources", "_registry")
+    
+    # Default registry
+    _task_registry = Registry.current()
     
-    def __init__(self, basename):
+    def __init__(self, basename, registry=None):
         self.basename = basename
         self.clean = True
-        TaskFactory._task_registry.append(self)
+        if registry is None:
+            registry = Registry.current()
+        self._registry = registry
+        registry.add(self)
+    
+    def __getstate__(self):
+        # NOTE: the registry is not pickled, an unpickled object does not belong
+        # to any registry
+        state = dict(getattr(self, "__dict__", {}))
+        for class_ in type(self).__mro__:
+            for name in class_.__dict__.get("__slots__", ()):
+                if name != "_registry" and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+    
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+    
+    @property
+    def targets(self):
+        return self._targets
+    
+    @targets.setter
+    def targets(self, targets):
+        # Keep the index of targets of the registry up-to-date
+        registry = getattr(self, "_registry", None)
+        if registry is None:
+            self._targets = targets
+            return
+        
+        previous = getattr(self, "_targets", None)
+        registry.remove_targets(self)
+        self._targets = targets
+        try:
+            registry.add_targets(self)
+        except Exception:
+            # Duplicate target in a strict registry
+            if previous is None:
+                # The object is being created: do not keep it registered
+                registry.remove(self)
+                self._registry = None
+            else:
+                self._targets = previous
+                registry.add_targets(self)
+            raise
+        registry.version += 1
+    
+    @classmethod
+    def map(class_, arguments):
+        """ Create a task for each item of arguments, and return the list of 
+            tasks. This is a shorthand for calling the constructor on each item:
+            the tasks are created and registered one at a time. arguments may be
+            
+            - an iterable of mappings (keyword arguments), of tuples and lists
+              (positional arguments), or of other values (single positional
+              argument),
+            - a mapping of argument names to columns of values, all of the same
+              length,
+            - a table with a to_dict method, such as a pandas DataFrame.
+            
+            >>> houses = BuildHouse.map(["Straw", "Sticks", "Bricks"])
+            >>> houses = BuildHouse.map({"material": ["Straw", "Sticks"]})
+        """
+        
+        if hasattr(arguments, "to_dict"):
+            arguments = arguments.to_dict("records")
+        elif isinstance(arguments, collections.abc.Mapping):
+            columns = {}
+            for name, column in arguments.items():
+                if isinstance(column, (str, bytes)):
+                    raise Exception(
+                        "Column {} must be a sequence of values, not {!r}".format(
+                            name, column))
+                columns[name] = list(column)
+            
+            lengths = set(len(x) for x in columns.values())
+            if len(lengths) > 1:
+                raise Exception(
+                    "Columns have different lengths: {}".format(
+                        ", ".join(
+                            "{} ({})".format(name, len(column))
+                            for name, column in columns.items())))
+            
+            arguments = [
+                dict(zip(columns.keys(), values))
+                for values in zip(*columns.values())]
+        elif isinstance(arguments, (str, bytes)):
+            raise Exception(
+                "Arguments must be an iterable of items, not {!r}".format(
+                    arguments))
+        
+        tasks = []
+        for item in arguments:
+            if isinstance(item, collections.abc.Mapping):
+                tasks.append(class_(**item))
+            elif isinstance(item, (tuple, list)):
+                tasks.append(class_(*item))
+            else:
+                tasks.append(class_(item))
+        return tasks
     
     def as_task_dict(self):
         if getattr(self, "skipped", False):
             return None
         else:
             fields = ["basename", "file_dep", "targets", "actions", "clean", "uptodate"]
-            return {x: getattr(self, x) for x in fields}
+            dict_ = {x: getattr(self, x) for x in fields}
+            resources = getattr(self, "resources", None)
+            if resources:
+                dict_["meta"] = {"resources": resources}
+            return dict_
     
     @property
     def target(self):
@@ -1,24 +1,161 @@
-import inspect
+import collections
+import fnmatch
+import itertools
 
-import doit
-
-from .task_factory import TaskFactory
+from .misc import path_key
+from .registry import Registry
 
 class TaskGraph(object):
-    def __init__(self, tasks):
-        # List of children for each Doit task
-        self.children = {}
+    """ Dependency graph of doit tasks, based on their file_dep and targets.
+        
+        The graph is built from an index of targets to the task producing them,
+        its construction is linear in the total number of file_dep and targets.
+        Paths are compared through their canonical form (cf. misc.path_key):
+        if root is specified, relative paths are resolved against it.
+        
+        spire_tasks, if specified, maps the names of the doit tasks to the Spire
+        objects they were created from. It defaults to the TaskFactory objects
+        of the current registry, using their basename.
+    """
+    
+    def __init__(self, tasks, root=None, spire_tasks=None):
+        self.root = root
+        
         # All Doit tasks (Spire and non-Spire)
         self.doit_tasks = {task.name: task for task in tasks}
         # Spire-only tasks
-        self.spire_tasks = {
-            task.basename: task for task in TaskFactory._task_registry}
+        if spire_tasks is None:
+            spire_tasks = {
+                task.basename: task for task in Registry.current()}
+        self.spire_tasks = spire_tasks
+        
+        # Name of the task producing each target
+        self.producers = {}
+        for task in tasks:
+            for target in task.targets:
+                self.producers.setdefault(path_key(target, root), task.name)
         
-        # NOTE: this is O(n^2).
+        # List of children and of parents for each Doit task, in the order of
+        # the tasks
+        index = {task.name: position for position, task in enumerate(tasks)}
+        self.children = {task.name: [] for task in tasks}
+        self.parents = {task.name: [] for task in tasks}
         for task in tasks:
-            children = []
-            for other_task in tasks:
-                if any(x in task.targets for x in other_task.file_dep):
-                    children.append(other_task.name)
+            parents = set()
+            for entry in task.file_dep:
+                producer = self.producers.get(path_key(entry, root))
+                if producer not in (None, task.name) and producer not in parents:
+                    parents.add(producer)
+                    self.children[producer].append(task.name)
+            self.parents[task.name] = sorted(parents, key=index.__getitem__)
+        
+        self.topological_order = self._get_topological_order()
+    
+    def producer_of(self, path):
+        """ Return the name of the task producing path, or None if path is not
+            the target of any task.
+        """
+        
+        return self.producers.get(path_key(path, self.root))
+    
+    def get_dependencies(self, name):
+        """ Return the names of the tasks that a task depends on, through its
+            file_dep (cf. parents) and through the task_dep, setup and calc_dep
+            of doit. Patterns of task_dep are matched against the task names.
+        """
+        
+        task = self.doit_tasks[name]
+        dependencies = list(self.parents[name])
+        
+        # NOTE: doit stores the patterns of task_dep in wild_dep
+        others = [
+            x for x in itertools.chain(
+                task.task_dep, task.setup_tasks, sorted(task.calc_dep))
+            if x in self.doit_tasks]
+        for pattern in task.wild_dep:
+            others.extend(fnmatch.filter(self.doit_tasks, pattern))
+        
+        for other in others:
+            if other != name and other not in dependencies:
+                dependencies.append(other)
+        return dependencies
+    
+    def get_levels(self, names=None):
+        """ Return the task names grouped by dependency level: the tasks of a
+            level only depend on tasks of the previous levels, including through
+            their task_dep, setup and calc_dep (cf. get_dependencies). If names
+            is specified, only include these tasks and the tasks they depend on.
+        """
+        
+        if names is None:
+            names = list(self.doit_tasks)
+        
+        # Selected tasks and their dependencies, in the order of the tasks
+        dependencies = {}
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name not in self.doit_tasks:
+                raise Exception("No such task: {}".format(name))
+            if name not in dependencies:
+                dependencies[name] = self.get_dependencies(name)
+                stack.extend(dependencies[name])
+        index = {name: position for position, name in enumerate(self.doit_tasks)}
+        dependencies = {
+            name: dependencies[name]
+            for name in sorted(dependencies, key=index.__getitem__)}
+        
+        # Levels, following a topological order (Kahn's algorithm)
+        dependents = {name: [] for name in dependencies}
+        for name, others in dependencies.items():
+            for other in others:
+                dependents[other].append(name)
+        in_degree = {name: len(others) for name, others in dependencies.items()}
+        queue = collections.deque(
+            name for name, degree in in_degree.items() if degree == 0)
+        
+        level_of = {}
+        levels = []
+        while queue:
+            name = queue.popleft()
+            level = max(
+                (level_of[x]+1 for x in dependencies[name]), default=0)
+            level_of[name] = level
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(name)
             
-            self.children[task.name] = children
+            for dependent in dependents[name]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    queue.append(dependent)
+        
+        if len(level_of) != len(dependencies):
+            cycle = sorted(set(dependencies) - set(level_of))
+            raise Exception("Cycle in task graph: {}".format(", ".join(cycle)))
+        
+        return levels
+    
+    def _get_topological_order(self):
+        """ Return the task names so that every task comes after its parents
+            (Kahn's algorithm).
+        """
+        
+        in_degree = {name: len(parents) for name, parents in self.parents.items()}
+        queue = collections.deque(
+            name for name, degree in in_degree.items() if degree == 0)
+        
+        order = []
+        while queue:
+            name = queue.popleft()
+            order.append(name)
+            for child in self.children[name]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    queue.append(child)
+        
+        if len(order) != len(in_degree):
+            cycle = sorted(name for name, degree in in_degree.items() if degree > 0)
+            raise Exception("Cycle in task graph: {}".format(", ".join(cycle)))
+        
+        return order
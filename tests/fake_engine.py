@@ -0,0 +1,47 @@
+""" Stand-in for a MATLAB worker (cf. spire.spm.worker.get_loop): the path of
+    each script is appended, along with the PID of the worker, to the log file
+    given on the command line. A script containing "error(" fails, a script
+    containing "exit(" stops the worker. In batch scripts (cf.
+    spire.spm.utils.get_batch_script), the status of each list of jobs is
+    written, a list failing if one of its steps contains "error(".
+"""
+
+import os
+import re
+import sys
+
+import spire.spm.worker
+
+log = sys.argv[1]
+
+print("SPM initialized")
+for path in sys.stdin:
+    path = path.strip()
+    if not path:
+        break
+    
+    with open(path) as fd:
+        script = fd.read()
+    if "exit(" in script:
+        break
+    
+    with open(log, "a") as fd:
+        fd.write("{} {}\n".format(os.getpid(), path))
+        fd.write(script)
+        fd.write("\n")
+    
+    steps = dict(
+        (int(index), line)
+        for index, line in re.findall(r"matlabbatch\{(\d+)\}(.*)$", script, re.M))
+    batches = re.findall(
+        r"matlabbatch\((\d+):(\d+)\).*\n"
+        r"spire_fid=fopen\('(.*?)','a'\);.*?,(\d+),spire_status\)", script)
+    for first, last, status_path, index in batches:
+        failed = any(
+            "error(" in steps[x] for x in range(int(first), int(last)+1))
+        with open(status_path, "a") as fd:
+            fd.write("{} {}\n".format(index, int(failed)))
+    
+    status = 1 if "error(" in script and not batches else 0
+    print("running {}".format(path))
+    print("{} {}".format(spire.spm.worker.sentinel, status), flush=True)
@@ -0,0 +1,14 @@
+import spire
+
+class Concatenate(spire.TaskFactory):
+    def __init__(self, sources, target):
+        spire.TaskFactory.__init__(self, target)
+        self.file_dep = sources
+        self.targets = [target]
+        self.actions = [
+            ["sh", "-c", "cat {} > {}".format(" ".join(sources), target)]]
+
+a = Concatenate(["root.dep"], "a")
+b = Concatenate(["root.dep"], "b")
+c = Concatenate([a.target, b.target], "c")
+d = Concatenate([c.target], "d")
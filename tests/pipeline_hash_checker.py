@@ -0,0 +1,8 @@
+import spire
+
+DOIT_CONFIG = {"check_file_uptodate": spire.HashChecker}
+
+class TestTask(spire.Task):
+    file_dep = ["dependency"]
+    target = "target"
+    action = ["cp", "dependency", "target"]
@@ -0,0 +1,16 @@
+import spire
+
+class Factory(spire.TaskFactory):
+    def __init__(self, file_dep, target):
+        spire.TaskFactory.__init__(self, target)
+        self.file_dep = [file_dep]
+        self.targets = [target]
+        self.actions = [["cp", file_dep, target]]
+
+class Unrelated(Factory):
+    def as_task_dict(self):
+        raise Exception("{} should not be loaded".format(self.basename))
+
+root = Factory("root.dep", "root.target")
+leaf = Factory(root.target, "leaf.target")
+unrelated = Unrelated("root.dep", "unrelated.target")
@@ -0,0 +1,17 @@
+import spire
+
+class Factory(spire.TaskFactory):
+    def __init__(self, file_dep, target):
+        spire.TaskFactory.__init__(self, target)
+        self.file_dep = [file_dep]
+        self.targets = [target]
+        self.actions = [["cp", file_dep, target]]
+
+a = Factory("root.dep", "a.target")
+
+def task_b():
+    return {
+        "file_dep": [a.target], "targets": ["b.target"],
+        "actions": [["cp", a.target, "b.target"]]}
+
+c = Factory("b.target", "c.target")
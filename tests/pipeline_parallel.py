@@ -0,0 +1,23 @@
+import shutil
+
+import spire
+
+@spire.task_factory
+def copy(source: spire.file_dep, destination: spire.target):
+    shutil.copy(source, destination)
+
+class Upper(spire.TaskFactory):
+    def __init__(self, source, destination):
+        spire.TaskFactory.__init__(self, destination)
+        self.file_dep = [source]
+        self.targets = [destination]
+        self.actions = [(self.upper, )]
+    
+    def upper(self):
+        with open(self.file_dep[0]) as fd:
+            data = fd.read()
+        with open(self.target, "w") as fd:
+            fd.write(data.upper())
+
+copies = [copy("{}.dep".format(x), "{}.copy".format(x)) for x in range(16)]
+uppers = [Upper(x.target, "{}.upper".format(x.basename)) for x in copies]
@@ -0,0 +1,31 @@
+import logging
+
+import spire
+
+class MyTask(spire.TaskFactory):
+    def __init__(self, file_dep, targets):
+        spire.TaskFactory.__init__(self, targets[0])
+        self.file_dep = file_dep
+        self.targets = targets
+        self.actions = [["touch", x] for x in self.targets]
+
+class SkippedRoot(spire.Task):
+    file_dep = [None]
+    target = "skipped_root.target"
+    actions = [["touch", target]]
+
+class SkippedLeaf(spire.Task):
+    file_dep = SkippedRoot.target
+    target = "skipped_leaf.target"
+    actions = [["touch", target]]
+
+root = MyTask(["root.dep"], ["root.target"])
+leaf = MyTask(root.targets, ["leaf.target"])
+
+skipped_root = MyTask([None], ["skipped_root_object.target"])
+skipped_leaf = MyTask(skipped_root.targets, ["skipped_leaf_object.target"])
+skipped_grandchild = MyTask(
+    skipped_leaf.targets, ["skipped_grandchild_object.target"])
+
+logging.basicConfig(level=logging.ERROR)
+spire.prune("prune.json")
@@ -0,0 +1,30 @@
+import time
+
+import spire
+
+def record(target):
+    start = time.monotonic()
+    time.sleep(0.2)
+    with open(target, "w") as fd:
+        fd.write("{} {}".format(start, time.monotonic()))
+
+@spire.task_factory(resources={"cpus": 4})
+def heavy(source: spire.file_dep, target: spire.target):
+    record(target)
+
+@spire.task_factory
+def light(source: spire.file_dep, target: spire.target):
+    record(target)
+
+class Licensed(spire.TaskFactory):
+    resources = {"memory": "1M", "exclusive": "license"}
+    
+    def __init__(self, source, target):
+        spire.TaskFactory.__init__(self, target)
+        self.file_dep = [source]
+        self.targets = [target]
+        self.actions = [(record, (target, ))]
+
+heavies = [heavy("input", "heavy_{}".format(x)) for x in range(3)]
+lights = [light("input", "light_{}".format(x)) for x in range(4)]
+licensed = [Licensed("input", "licensed_{}".format(x)) for x in range(3)]
@@ -0,0 +1,149 @@
+import ast
+import hashlib
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import unittest
+
+import doit.action
+import numpy
+
+import spire.misc
+
+class Object(object):
+    def __init__(self, value):
+        self.value = value
+        self.paths = [pathlib.Path("foo"), "bar"]
+
+class SlottedObject(object):
+    __slots__ = ("value",)
+    
+    def __init__(self, value):
+        self.value = value
+    
+    def __getstate__(self):
+        return {"value": self.value}
+
+def function(*args, **kwargs):
+    pass
+
+def helper():
+    return 1
+
+def caller():
+    return helper()
+
+def make_closure(value):
+    def closure():
+        return value
+    return closure
+
+class TestActionDigest(unittest.TestCase):
+    def test_command(self):
+        digests = [
+            spire.misc._get_digest(doit.action.CmdAction(x))
+            for x in [["touch", "foo"], ["touch", "foo"], ["touch", "bar"]]]
+        self.assertEqual(digests[0], digests[1])
+        self.assertNotEqual(digests[0], digests[2])
+    
+    def test_python(self):
+        digests = [
+            spire.misc._get_digest(doit.action.PythonAction(function, *x))
+            for x in [
+                ([Object(1)], {"foo": numpy.arange(3)}),
+                ([Object(1)], {"foo": numpy.arange(3)}),
+                ([Object(2)], {"foo": numpy.arange(3)}),
+                ([Object(1)], {"foo": numpy.arange(4)}),
+            ]]
+        self.assertEqual(digests[0], digests[1])
+        self.assertEqual(len(set(digests[1:])), 3)
+    
+    def test_shared_objects(self):
+        shared = Object(1)
+        shared.self = shared
+        digest_1 = spire.misc._python_digest(
+            doit.action.PythonAction(function, [shared, shared]))
+        digest_2 = spire.misc._python_digest(
+            doit.action.PythonAction(function, [shared, Object(1)]))
+        self.assertNotEqual(digest_1, digest_2)
+    
+    def test_temporary_states(self):
+        # The states of the objects are temporary: their ids may be re-used
+        digests = [
+            spire.misc._python_digest(doit.action.PythonAction(function, x))
+            for x in [
+                [SlottedObject(1), SlottedObject(2)],
+                [SlottedObject(1), SlottedObject(3)]]]
+        self.assertNotEqual(digests[0], digests[1])
+    
+    def test_memoization(self):
+        action = doit.action.PythonAction(function, [Object(1)])
+        digest = spire.misc._get_digest(action)
+        
+        # Digest is not computed again for the same action object
+        action.args[0].value = 2
+        self.assertEqual(spire.misc._get_digest(action), digest)
+
+    def test_function(self):
+        def digest(function):
+            return spire.misc._python_digest(doit.action.PythonAction(function))
+        
+        def with_default(x=1):
+            return x
+        original = digest(with_default)
+        self.assertEqual(digest(with_default), original)
+        
+        with_default.__defaults__ = (2,)
+        self.assertNotEqual(digest(with_default), original)
+        
+        self.assertNotEqual(
+            digest(make_closure(1)), digest(make_closure(2)))
+        self.assertEqual(
+            digest(make_closure(1)), digest(make_closure(1)))
+    
+    def test_references(self):
+        global helper
+        
+        original_helper = helper
+        original = spire.misc._python_digest(doit.action.PythonAction(caller))
+        try:
+            helper = lambda: 2
+            modified = spire.misc._python_digest(doit.action.PythonAction(caller))
+        finally:
+            helper = original_helper
+        self.assertNotEqual(original, modified)
+
+    def test_source(self):
+        def digest(source):
+            hash = hashlib.sha1()
+            spire.misc._update_ast_digest(hash, ast.parse(source))
+            return hash.hexdigest()
+        
+        # Digest of the AST does not depend on the Python version
+        self.assertEqual(
+            digest("def f(x): return x+1"),
+            "1d0733fed78fb8c824db3a4852fee9833b988e59")
+        self.assertNotEqual(
+            digest("def f(x): return x+1"), digest("def f(x): return x+2"))
+    
+    def test_decorators(self):
+        directory = tempfile.mkdtemp()
+        try:
+            digests = []
+            for argument in [1, 2]:
+                source = "@decorate({})\ndef f(x):\n    return x+1\n".format(
+                    argument)
+                path = os.path.join(directory, "module_{}.py".format(argument))
+                with open(path, "w") as fd:
+                    fd.write(source)
+                namespace = {"decorate": lambda x: (lambda f: f)}
+                exec(compile(source, path, "exec"), namespace)
+                digests.append(spire.misc._code_digest(namespace["f"].__code__))
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(digests[0], digests[1])
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,98 @@
+import sys
+import unittest
+
+import spire
+
+@spire.task_factory
+def function(
+        input: spire.file_dep, others: spire.file_dep, output: spire.target, 
+        flag=False, *, log: spire.target=None):
+    pass
+
+@spire.command_factory
+def command(input: spire.file_dep, output: spire.target, *args):
+    return ["cp", input, output, *args]
+
+@spire.command_factory
+def touch(output: spire.target):
+    return ["touch", output]
+
+@spire.command_factory(resources={"cpus": 2})
+def heavy_touch(output: spire.target):
+    return ["touch", output]
+
+class TestDecorators(unittest.TestCase):
+    def setUp(self):
+        self.registry = spire.Registry().__enter__()
+    
+    def tearDown(self):
+        self.registry.__exit__(None, None, None)
+    
+    def test_positional(self):
+        task = function("foo", ["bar", "baz"], "plip")
+        self.assertEqual(task.file_dep, ("foo", "bar", "baz"))
+        self.assertEqual(task.targets, ("plip",))
+        self.assertEqual(task.basename, "plip")
+        self.assertEqual(len(task.actions), 1)
+        self.assertEqual(
+            task.actions[0][1:], (("foo", ["bar", "baz"], "plip"), {}))
+    
+    def test_keyword(self):
+        task = function("foo", output="plip", others=[], log="plip.log")
+        self.assertEqual(task.file_dep, ("foo",))
+        self.assertEqual(task.targets, ("plip", "plip.log"))
+    
+    def test_variadic(self):
+        task = command("foo", "bar", "-f")
+        self.assertEqual(task.file_dep, ("foo",))
+        self.assertEqual(task.targets, ("bar",))
+        self.assertEqual(task.actions, (["cp", "foo", "bar", "-f"],))
+    
+    def test_map(self):
+        tasks = command.map([
+            ("foo", "bar"), {"input": "plip", "output": "plop"}])
+        self.assertEqual([x.targets for x in tasks], [("bar",), ("plop",)])
+        
+        tasks = command.map({"input": ["foo", "plip"], "output": ["bar", "plop"]})
+        self.assertEqual([x.file_dep for x in tasks], [("foo",), ("plip",)])
+        self.assertEqual([x.targets for x in tasks], [("bar",), ("plop",)])
+    
+    def test_map_single_argument(self):
+        tasks = touch.map(["foo", "bar"])
+        self.assertEqual([x.targets for x in tasks], [("foo",), ("bar",)])
+    
+    def test_map_errors(self):
+        with self.assertRaises(Exception):
+            command.map({"input": ["foo", "plip"], "output": ["bar"]})
+        with self.assertRaises(Exception):
+            command.map({"input": "foo", "output": "bar"})
+        with self.assertRaises(Exception):
+            touch.map("foo")
+    
+    def test_resources(self):
+        task = touch("foo")
+        self.assertIsNone(task.as_task_dict().get("meta"))
+        task.resources = {"cpus": 4}
+        self.assertEqual(
+            task.as_task_dict()["meta"], {"resources": {"cpus": 4}})
+        
+        # Resources of the decorator may be overridden by each object
+        task = heavy_touch("bar")
+        self.assertEqual(
+            task.as_task_dict()["meta"], {"resources": {"cpus": 2}})
+        task.resources = {"cpus": 8}
+        self.assertEqual(
+            task.as_task_dict()["meta"], {"resources": {"cpus": 8}})
+    
+    def test_errors(self):
+        with self.assertRaises(TypeError):
+            function("foo", ["bar"])
+        with self.assertRaises(TypeError):
+            function("foo", ["bar"], "plip", output="plop")
+        with self.assertRaises(TypeError):
+            function("foo", ["bar"], "plip", unknown=1)
+        with self.assertRaises(TypeError):
+            function("foo", ["bar"], "plip", True, "plop")
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
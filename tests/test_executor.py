@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import spire.executor
+
+from test_base import TestBase
+
+class TestExecutor(TestBase):
+    
+    file_dep = ["root.dep"]
+    
+    def setUp(self):
+        TestBase.setUp(self)
+        with open(os.path.join(self.directory, "root.dep"), "w") as fd:
+            fd.write("root\n")
+    
+    def test_submit(self):
+        scripts = os.path.join(self.directory, "jobs")
+        output = subprocess.check_output(
+            [
+                sys.executable, "-m", "spire", "submit",
+                os.path.join(self.here, "pipeline_executor.py"),
+                "--executor", "local", "--scripts-directory", scripts,
+                "-d", self.directory],
+            universal_newlines=True)
+        
+        # One job array per level. NOTE: the output also contains the output of
+        # the jobs.
+        self.assertEqual(
+            [x for x in output.split("\n") if x.startswith("local-")],
+            ["local-1", "local-2", "local-3"])
+        self.assertEqual(
+            sorted(os.listdir(scripts)),
+            ["level_0.sh", "level_1.sh", "level_2.sh"])
+        
+        with open(os.path.join(self.directory, "d")) as fd:
+            self.assertEqual(fd.read(), "root\nroot\n")
+    
+    def test_task(self):
+        scripts = os.path.join(self.directory, "jobs")
+        subprocess.check_output(
+            [
+                sys.executable, "-m", "spire", "submit",
+                os.path.join(self.here, "pipeline_executor.py"),
+                "--executor", "local", "--scripts-directory", scripts,
+                "--task", "b", "-d", self.directory])
+        
+        entries = os.listdir(self.directory)
+        self.assertTrue("b" in entries)
+        self.assertFalse("a" in entries)
+    
+    def test_failure(self):
+        executor = spire.executor.LocalExecutor(
+            "tasks.py", scripts_directory=self.directory)
+        
+        scripts = []
+        for index, code in enumerate([0, 1, 0]):
+            path = os.path.join(self.directory, "{}.sh".format(index))
+            with open(path, "w") as fd:
+                fd.write("#!/bin/sh\n")
+                fd.write("touch {}.${}\n".format(path, executor.index_variable))
+                fd.write("exit {}\n".format(code))
+            os.chmod(path, 0o755)
+            scripts.append(path)
+        
+        resources = {"cpus": 1, "memory": 0}
+        first = executor.submit_array(scripts[0], 2, [], resources)
+        second = executor.submit_array(scripts[1], 1, [first], resources)
+        third = executor.submit_array(scripts[2], 1, [second], resources)
+        self.assertEqual(
+            executor.jobs, {first: True, second: False, third: False})
+        
+        entries = os.listdir(self.directory)
+        for name in ["0.sh.0", "0.sh.1", "1.sh.0"]:
+            self.assertTrue(name in entries)
+        self.assertFalse("2.sh.0" in entries)
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,96 @@
+import io
+import sys
+import unittest
+import xml.etree.ElementTree
+
+import doit.task
+
+import spire
+import spire.export
+
+class Factory(object):
+    pass
+
+class MyTask(spire.TaskFactory):
+    def __init__(self, name):
+        spire.TaskFactory.__init__(self, name)
+        self.file_dep = []
+        self.targets = ["{}.target".format(name)]
+        self.actions = [["touch", self.targets[0]]]
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        tasks = [
+            doit.task.Task("A", ["foo"], file_dep=["a.dep"], targets=["a"]),
+            doit.task.Task("B1", ["bar"], file_dep=["a"], targets=["b1"]),
+            doit.task.Task("B2", ["bar"], file_dep=["./a"], targets=["b2"]),
+            doit.task.Task("C", ["baz"], file_dep=["b1", "b2"], targets=["c"]),
+        ]
+        spire_tasks = {"B1": Factory(), "B2": Factory()}
+        self.graph = spire.TaskGraph(tasks, spire_tasks=spire_tasks)
+    
+    def test_shared_file(self):
+        fd = io.StringIO()
+        fd.writelines(spire.export.iter_dot(self.graph))
+        dot = fd.getvalue()
+        
+        # Shared file has a single node, using its first name
+        self.assertEqual(dot.count("\"a\"[shape=parallelogram];"), 1)
+        self.assertEqual(dot.count("\"a\" -> \"B2\";"), 1)
+        self.assertFalse("./a" in dot)
+    
+    def test_collapse(self):
+        dot = "".join(spire.export.iter_dot(self.graph, collapse=True))
+        self.assertEqual(
+            dot,
+            "digraph {\n"
+            "    \"A\"[shape=box];\n"
+            "    \"Factory\"[shape=box3d,label=\"Factory (2)\"];\n"
+            "    \"A\" -> \"Factory\";\n"
+            "    \"C\"[shape=box];\n"
+            "    \"Factory\" -> \"C\";\n"
+            "}\n")
+    
+    def test_graphml(self):
+        root = xml.etree.ElementTree.fromstring(
+            "".join(spire.export.iter_graphml(self.graph)))
+        namespace = {"": "http://graphml.graphdrawing.org/xmlns"}
+        nodes = root.findall("graph/node", namespace)
+        self.assertEqual([x.get("id") for x in nodes], ["A", "B1", "B2", "C"])
+        edges = root.findall("graph/edge", namespace)
+        self.assertEqual(
+            [(x.get("source"), x.get("target")) for x in edges],
+            [("A", "B1"), ("A", "B2"), ("B1", "C"), ("B2", "C")])
+    
+    def test_diff(self):
+        old = spire.export.as_dict(self.graph)
+        
+        tasks = [
+            doit.task.Task("A", ["foo"], file_dep=["a.dep"], targets=["a"]),
+            doit.task.Task("B1", ["bar"], file_dep=["a"], targets=["b1"]),
+            doit.task.Task("B2", ["plip"], file_dep=["./a"], targets=["b2"]),
+            doit.task.Task("C", ["baz"], file_dep=["b1", "b2"], targets=["c"]),
+            doit.task.Task("D", ["baz"], file_dep=["a"], targets=["d"]),
+        ]
+        new = spire.export.as_dict(spire.TaskGraph(tasks))
+        
+        self.assertEqual(
+            spire.export.diff(old, new),
+            {
+                "added": ["D"], "removed": [], "changed": {"B2": ["actions"]},
+                "affected": ["B2", "D", "C"]})
+    
+    def test_graph(self):
+        with spire.Registry():
+            MyTask("foo")
+            
+            # Name mapper is the first parameter of spire.graph
+            dot = spire.graph(str.upper)
+            self.assertTrue("\"FOO\"[shape=box];" in dot)
+            self.assertTrue("\"FOO.TARGET\"[shape=parallelogram];" in dot)
+            
+            dot = spire.graph(str.upper, tasks_only=True)
+            self.assertFalse("FOO.TARGET" in dot)
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
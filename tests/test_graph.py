@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 import unittest
@@ -46,6 +47,26 @@ class TestGraph(TestBase):
             "    \"A\" -> \"B\";\n"
             "}\n"
         )
+    
+    def test_json(self):
+        spire.__main__.graph(
+            os.path.join(self.here, "pipeline_graph.py"),
+            os.path.join(self.directory, "pipeline.json"), 
+            False, ["-d", self.directory], format="json")
+        with open(os.path.join(self.directory, "pipeline.json")) as fd:
+            data = json.load(fd)
+        for task in data["tasks"]:
+            self.assertEqual(len(task.pop("actions")), 1)
+        self.assertEqual(
+            data,
+            {
+                "tasks": [
+                    {
+                        "name": "A", "file_dep": ["A.dep"], 
+                        "targets": ["A.target"], "parents": []},
+                    {
+                        "name": "B", "file_dep": ["A.target"], 
+                        "targets": ["B.target"], "parents": ["A"]}]})
 
 if __name__ == "__main__":
     sys.exit(unittest.main())
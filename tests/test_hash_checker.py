@@ -0,0 +1,84 @@
+import os
+import unittest
+import subprocess
+import sys
+import time
+
+import spire.misc
+
+from test_base import TestBase
+
+class TestHashChecker(TestBase):
+    
+    file_dep = ["dependency"]
+    
+    def test_cache(self):
+        path = os.path.join(self.directory, "dependency")
+        with open(path, "w") as fd:
+            fd.write("foo")
+        
+        cache_path = os.path.join(self.directory, "cache.sqlite3")
+        cache = spire.misc.HashCache(cache_path)
+        digest = cache.get_digest(path)
+        cache.close()
+        
+        # Digest is loaded from the database, not computed
+        cache = spire.misc.HashCache(cache_path)
+        self.assertEqual(cache._entries[path][1], digest)
+        self.assertEqual(cache.get_digest(path), digest)
+        
+        with open(path, "w") as fd:
+            fd.write("bar")
+        self.assertNotEqual(cache.get_digest(path), digest)
+        cache.close()
+    
+    def test_flush(self):
+        paths = []
+        for index in range(5):
+            paths.append(os.path.join(self.directory, "file_{}".format(index)))
+            with open(paths[-1], "w") as fd:
+                fd.write(str(index))
+        
+        cache_path = os.path.join(self.directory, "cache.sqlite3")
+        cache = spire.misc.HashCache(cache_path)
+        cache.flush_size = 2
+        for path in paths:
+            cache.get_digest(path)
+        
+        # Digests are written in batches
+        other = spire.misc.HashCache(cache_path)
+        self.assertEqual(len(other._entries), 4)
+        other.close()
+        
+        # Remaining digests are written on close
+        cache.close()
+        other = spire.misc.HashCache(cache_path)
+        self.assertEqual(sorted(other._entries), sorted(paths))
+        other.close()
+    
+    def test_run(self):
+        self.assertTrue(b".  TestTask" in self._run())
+        self.assertTrue(
+            ".spire-hashes.sqlite3" in os.listdir(self.directory))
+        
+        # Up-to-date
+        self.assertTrue(b"-- TestTask" in self._run())
+        
+        # Same content, different modification time: still up-to-date
+        time.sleep(0.01)
+        os.utime(os.path.join(self.directory, "dependency"))
+        self.assertTrue(b"-- TestTask" in self._run())
+        
+        # Different content
+        with open(os.path.join(self.directory, "dependency"), "w") as fd:
+            fd.write("foo")
+        self.assertTrue(b".  TestTask" in self._run())
+    
+    def _run(self):
+        return subprocess.check_output([
+            "doit", "run", 
+            "-f", os.path.join(self.here, "pipeline_hash_checker.py"), 
+            "-d", self.directory])
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import unittest
+
+class TestImportTime(unittest.TestCase):
+    
+    # Budget for "import spire", in seconds, including the import of doit
+    budget = 1.
+    
+    def test_budget(self):
+        output = self._import("spire")
+        
+        # Lines of -X importtime are "import time: self | cumulative | module"
+        cumulative = None
+        for line in output.splitlines():
+            fields = [x.strip() for x in line.split("|")]
+            if len(fields) == 3 and fields[2] == "spire":
+                cumulative = 1e-6*int(fields[1])
+        self.assertIsNotNone(cumulative)
+        self.assertLess(cumulative, self.budget)
+    
+    def test_lazy_modules(self):
+        modules = self._get_modules(self._import("spire"))
+        for module in ["jinja2", "numpy", "spire.ants", "spire.spm", "sqlite3"]:
+            self.assertFalse(module in modules)
+        
+        modules = self._get_modules(self._import("spire.spm"))
+        for module in ["jinja2", "numpy"]:
+            self.assertFalse(module in modules)
+    
+    def _import(self, module):
+        environment = os.environ.copy()
+        environment["PYTHONPATH"] = os.pathsep.join([
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            environment.get("PYTHONPATH", "")])
+        return subprocess.check_output(
+            [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+            stderr=subprocess.STDOUT, env=environment).decode()
+    
+    def _get_modules(self, output):
+        return set(
+            line.split("|")[-1].strip() for line in output.splitlines()
+            if line.startswith("import time:"))
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,45 @@
+import os
+import unittest
+import subprocess
+import sys
+
+from test_base import TestBase
+
+class TestLazy(TestBase):
+    
+    file_dep = ["root.dep"]
+    
+    def test_target(self):
+        self._run("leaf.target")
+        entries = os.listdir(self.directory)
+        self.assertTrue("root.target" in entries)
+        self.assertTrue("leaf.target" in entries)
+        self.assertFalse("unrelated.target" in entries)
+    
+    def test_task(self):
+        self._run("root.target")
+        entries = os.listdir(self.directory)
+        self.assertTrue("root.target" in entries)
+        self.assertFalse("leaf.target" in entries)
+    
+    def test_other_task(self):
+        # Objects required by a non-Spire task are loaded
+        self._run("c.target", pipeline="pipeline_lazy_mixed.py")
+        entries = os.listdir(self.directory)
+        for target in ["a.target", "b.target", "c.target"]:
+            self.assertTrue(target in entries)
+    
+    def test_all(self):
+        # All tasks are loaded
+        with self.assertRaises(subprocess.CalledProcessError):
+            self._run()
+    
+    def _run(self, *names, pipeline="pipeline_lazy.py"):
+        subprocess.check_output(
+            [
+                "doit", "run", "-f", os.path.join(self.here, pipeline),
+                "-d", self.directory, *names],
+            stderr=subprocess.STDOUT)
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,73 @@
+import gc
+import sys
+import tracemalloc
+import unittest
+
+import spire
+import spire.misc
+
+@spire.command_factory
+def slotted(input: spire.file_dep, output: spire.target):
+    return ["cp", input, output]
+
+class WithDict(spire.TaskFactory):
+    def __init__(self, input, output):
+        spire.TaskFactory.__init__(self, output)
+        self.file_dep = [input]
+        self.targets = [output]
+        self.actions = [["cp", input, output]]
+        self.extra = None
+
+class Unslotted(object):
+    """ Layout of TaskFactory objects without slots: members are stored in a
+        __dict__, file_dep, targets and actions in lists.
+    """
+    
+    def __init__(self, input, output):
+        self.basename = output
+        self.clean = True
+        self.file_dep = [input]
+        self.targets = [output]
+        self.actions = [["cp", input, output]]
+        spire.Registry.current().add(self)
+
+class TestMemory(unittest.TestCase):
+    def setUp(self):
+        self.registry = spire.Registry().__enter__()
+    
+    def tearDown(self):
+        self.registry.__exit__(None, None, None)
+    
+    def test_slots(self):
+        task = slotted("foo", "bar")
+        self.assertFalse(hasattr(task, "__dict__"))
+        with self.assertRaises(AttributeError):
+            task.extra = None
+        
+        # Derived classes which do not define slots have a __dict__
+        task = WithDict("foo", "bar")
+        self.assertTrue(hasattr(task, "__dict__"))
+    
+    def test_benchmark(self):
+        count = 10000
+        arguments = [
+            ("input_{}.nii.gz".format(x), "output_{}.nii.gz".format(x))
+            for x in range(count)]
+        
+        sizes = {}
+        for class_ in [slotted, Unslotted]:
+            # Each class is measured in its own registry, with an empty cache of
+            # paths
+            with spire.Registry():
+                spire.misc._path_key.cache_clear()
+                gc.collect()
+                tracemalloc.start()
+                tasks = [class_(*x) for x in arguments]
+                sizes[class_] = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                del tasks
+        
+        self.assertLess(sizes[slotted], 0.9*sizes[Unslotted])
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
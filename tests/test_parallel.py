@@ -0,0 +1,55 @@
+import os
+import pickle
+import unittest
+import subprocess
+import sys
+
+import spire
+
+from test_base import TestBase
+
+@spire.task_factory
+def function(input: spire.file_dep, output: spire.target):
+    pass
+
+class TestParallel(TestBase):
+    
+    file_dep = ["{}.dep".format(x) for x in range(16)]
+    
+    def setUp(self):
+        TestBase.setUp(self)
+        for path in self.file_dep:
+            with open(os.path.join(self.directory, path), "w") as fd:
+                fd.write(path)
+    
+    def test_pickle(self):
+        with spire.Registry() as registry:
+            task = function("foo", "bar")
+        
+        action = pickle.loads(pickle.dumps(task.actions[0]))
+        self.assertEqual(action, task.actions[0])
+        
+        copy = pickle.loads(pickle.dumps(task))
+        self.assertIs(type(copy), function)
+        self.assertEqual(copy.file_dep, task.file_dep)
+        self.assertEqual(copy.targets, task.targets)
+        self.assertEqual(copy.actions, task.actions)
+        self.assertFalse(copy in registry)
+    
+    def test_process(self):
+        subprocess.check_output(
+            [
+                "doit", "run", "-n", "8", "-P", "process",
+                "-f", os.path.join(self.here, "pipeline_parallel.py"),
+                "-d", self.directory],
+            stderr=subprocess.STDOUT)
+        
+        for path in self.file_dep:
+            root = os.path.join(self.directory, path.replace(".dep", ""))
+            with open(root+".copy") as fd:
+                self.assertEqual(fd.read(), path)
+            with open(root+".copy.upper") as fd:
+                self.assertEqual(fd.read(), path.upper())
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -1,4 +1,5 @@
 import itertools
+import json
 import os
 import subprocess
 import sys
@@ -32,6 +33,28 @@ class TestPrune(TestBase):
             for prefix, suffix in itertools.product(prefixes, self.suffixes)]
         for target in skipped_targets:
             self.assertTrue(target not in entries)
+    
+    def test_dump(self):
+        subprocess.check_output([
+            "doit", "run", "-f", os.path.join(self.here, "pipeline_prune_dump.py"),
+            "-d", self.directory])
+        entries = os.listdir(self.directory)
+        self.assertTrue("leaf.target" in entries)
+        self.assertTrue("skipped_leaf.target" not in entries)
+        
+        with open(os.path.join(self.directory, "prune.json")) as fd:
+            skipped = json.load(fd)
+        self.assertEqual(
+            skipped["roots"], 
+            {"SkippedRoot": 2, "skipped_root_object.target": 3})
+        self.assertEqual(
+            skipped["parents"],
+            {
+                "SkippedRoot": None, "SkippedLeaf": "SkippedRoot",
+                "skipped_root_object.target": None,
+                "skipped_leaf_object.target": "skipped_root_object.target",
+                "skipped_grandchild_object.target": 
+                    "skipped_leaf_object.target"})
 
 if __name__ == "__main__":
     sys.exit(unittest.main())
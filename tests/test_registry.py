@@ -0,0 +1,135 @@
+import gc
+import sys
+import unittest
+import weakref
+
+import spire
+
+class Factory(spire.TaskFactory):
+    def __init__(self, name, registry=None):
+        spire.TaskFactory.__init__(self, name, registry)
+        self.file_dep = ["{}.dep".format(name)]
+        self.targets = ["{}.target".format(name)]
+        self.actions = [["touch", self.targets[0]]]
+
+class MultipleTargets(spire.TaskFactory):
+    def __init__(self, name, targets):
+        spire.TaskFactory.__init__(self, name)
+        self.file_dep = []
+        self.targets = targets
+        self.actions = [["touch", *targets]]
+
+class TestRegistry(unittest.TestCase):
+    def test_scope(self):
+        default = spire.Registry.current()
+        with spire.Registry() as registry:
+            self.assertIs(spire.Registry.current(), registry)
+            foo = Factory("foo")
+            bar = Factory("bar")
+        self.assertIs(spire.Registry.current(), default)
+        
+        self.assertEqual(list(registry), [foo, bar])
+        self.assertFalse(foo in default)
+        self.assertIs(registry.get("bar"), bar)
+        self.assertIsNone(default.get("bar"))
+    
+    def test_explicit(self):
+        registry = spire.Registry()
+        foo = Factory("foo", registry)
+        self.assertTrue(foo in registry)
+        self.assertFalse(foo in spire.Registry.current())
+    
+    def test_remove(self):
+        with spire.Registry() as registry:
+            foo = Factory("foo")
+            bar = Factory("bar")
+            
+            self.assertEqual(
+                [x.name for _, x in spire._get_registry_tasks()], ["foo", "bar"])
+            registry.remove(foo)
+            self.assertEqual(
+                [x.name for _, x in spire._get_registry_tasks()], ["bar"])
+            self.assertIsNone(registry.get("foo"))
+            
+            with self.assertRaises(ValueError):
+                registry.remove(foo)
+            
+            registry.clear()
+            self.assertEqual(len(registry), 0)
+    
+    def test_duplicates(self):
+        with spire.Registry() as registry:
+            foo = Factory("foo")
+            self.assertIs(registry.producer_of("./foo.target"), foo)
+            
+            with self.assertLogs(level="WARNING"):
+                other_foo = Factory("foo")
+            self.assertEqual(
+                registry.duplicates, 
+                [
+                    ("basename", "foo", foo, other_foo), 
+                    ("target", "foo.target", foo, other_foo)])
+    
+    def test_strict(self):
+        with spire.Registry(strict=True) as registry:
+            foo = Factory("foo")
+            with self.assertRaises(Exception):
+                Factory("foo")
+            
+            bar = Factory("bar")
+            with self.assertRaises(Exception):
+                bar.targets = ["foo.target"]
+            
+            # Failed modification does not change the index
+            self.assertIs(registry.producer_of("bar.target"), bar)
+            self.assertEqual(bar.targets, ["bar.target"])
+            
+            # Object whose creation failed is not registered
+            with self.assertRaises(Exception):
+                MultipleTargets("plop", ["plop.target", "bar.target"])
+            self.assertIsNone(registry.get("plop"))
+            self.assertIsNone(registry.producer_of("plop.target"))
+            self.assertEqual(
+                [x.name for _, x in spire._get_registry_tasks()],
+                ["foo", "bar"])
+            
+            # Modified targets are updated in the index
+            foo.targets = ["plip.target"]
+            bar.targets = ["foo.target"]
+            self.assertIs(registry.producer_of("foo.target"), bar)
+    
+    def test_discard(self):
+        with spire.Registry() as registry:
+            reference = weakref.ref(Factory("foo"))
+            spire._get_registry_tasks()
+        del registry
+        gc.collect()
+        self.assertIsNone(reference())
+    
+    def test_remove_references(self):
+        with spire.Registry() as registry:
+            foo = Factory("foo")
+            with self.assertLogs(level="WARNING"):
+                other_foo = Factory("foo")
+            spire._get_graph({"__file__": "registry_tasks.py"})
+            self.assertEqual(len(registry.graphs), 1)
+            
+            reference = weakref.ref(other_foo)
+            registry.remove(other_foo)
+            del other_foo
+            gc.collect()
+            self.assertIsNone(reference())
+            self.assertEqual(registry.duplicates, [])
+            self.assertEqual(registry.graphs, {})
+            
+            with self.assertLogs(level="WARNING"):
+                Factory("foo")
+            registry.clear()
+            self.assertEqual(registry.duplicates, [])
+    
+    def test_path_cache(self):
+        # Canonical paths are cached for a bounded number of paths
+        self.assertIsNotNone(spire.misc._path_key.cache_info().maxsize)
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import spire.runner
+
+from test_base import TestBase
+
+class TestRunner(TestBase):
+    
+    file_dep = ["input"]
+    
+    def test_parse_memory(self):
+        self.assertEqual(spire.runner.parse_memory(1024), 1024)
+        self.assertEqual(spire.runner.parse_memory("1024"), 1024)
+        self.assertEqual(spire.runner.parse_memory("512M"), 512*2**20)
+        self.assertEqual(spire.runner.parse_memory("1.5gb"), 3*2**29)
+    
+    def test_run(self):
+        subprocess.check_output(
+            [
+                sys.executable, "-m", "spire", "run",
+                "-f", os.path.join(self.here, "pipeline_resources.py"),
+                "-d", self.directory, "--cpus", "4"],
+            stderr=subprocess.STDOUT)
+        
+        intervals = {}
+        for kind, count in [["heavy", 3], ["light", 4], ["licensed", 3]]:
+            intervals[kind] = []
+            for index in range(count):
+                path = os.path.join(self.directory, "{}_{}".format(kind, index))
+                with open(path) as fd:
+                    intervals[kind].append([float(x) for x in fd.read().split()])
+        
+        # Tasks using all CPUs do not run along other tasks
+        for heavy in intervals["heavy"]:
+            for kind, others in intervals.items():
+                for other in others:
+                    if other is not heavy:
+                        self.assertFalse(self._overlap(heavy, other))
+        
+        # Tasks sharing an exclusive resource do not run concurrently
+        licensed = intervals["licensed"]
+        for index, first in enumerate(licensed):
+            for second in licensed[index+1:]:
+                self.assertFalse(self._overlap(first, second))
+        
+        # Light tasks run concurrently
+        self.assertTrue(
+            any(
+                self._overlap(first, second)
+                for first in intervals["light"]
+                for second in intervals["light"] if first is not second))
+    
+    def _overlap(self, first, second):
+        return first[0] < second[1] and second[0] < first[1]
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
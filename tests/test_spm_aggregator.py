@@ -0,0 +1,79 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+import spire.spm
+import spire.spm.aggregator
+import spire.spm.worker
+
+class Step(spire.spm.SPMObject):
+    def __init__(self, step):
+        spire.spm.SPMObject.__init__(self, "spm.fake")
+        self.step = step
+        self.template = "{{ id(index, name) }} = '{{ step }}';"
+
+class TestSPMAggregator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = os.path.join(self.directory, "log")
+        self.command = [
+            sys.executable,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_engine.py"),
+            self.log]
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_script(self):
+        script = spire.spm.get_batch_script(
+            [[Step("a"), Step("b")], [Step("c")]], "status.txt")
+        lines = script.split("\n")
+        self.assertEqual(
+            lines[:5], [
+                "spm('defaults','fmri');", "spm_jobman('initcfg');",
+                "matlabbatch{1}.spm.fake = 'a';",
+                "matlabbatch{2}.spm.fake = 'b';",
+                "matlabbatch{3}.spm.fake = 'c';"])
+        self.assertTrue("matlabbatch(1:2)" in lines[5])
+        self.assertTrue("'status.txt'" in lines[6] and ",0," in lines[6])
+        self.assertTrue("matlabbatch(3:3)" in lines[7])
+        self.assertTrue("'status.txt'" in lines[8] and ",1," in lines[8])
+        self.assertEqual(lines[9], "exit();")
+    
+    def test_run(self):
+        jobs = [[Step("job{}".format(x))] for x in range(4)]
+        jobs[2].append(Step("error("))
+        
+        errors = {}
+        def run(index):
+            try:
+                spire.spm.run(jobs[index])
+            except Exception as e:
+                errors[index] = e
+        
+        with spire.spm.worker.Pool(self.command):
+            with spire.spm.aggregator.Aggregator(delay=10, size=len(jobs)):
+                threads = [
+                    threading.Thread(target=run, args=(x,))
+                    for x in range(len(jobs))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        
+        # Only the failed job raises
+        self.assertEqual(list(errors.keys()), [2])
+        
+        # All jobs are run in the same batch
+        with open(self.log) as fd:
+            log = fd.read()
+        self.assertEqual(log.count("spire_status=0"), 4)
+        self.assertEqual(
+            len([x for x in log.split("\n") if x.startswith(tuple("0123456789"))]),
+            1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import spire.spm
+from spire.spm import spm_object
+
+class Tool(spire.spm.SPMObject):
+    def __init__(self, value):
+        spire.spm.SPMObject.__init__(self, "spm.tools.test")
+        self.value = value
+        self.template = (
+            "{{ id(index, name) }}.value = {{ value }}; % test_spm_object")
+
+class TestSPMObject(unittest.TestCase):
+    def test_shared_template(self):
+        first, second = Tool(1), Tool(2)
+        self.assertEqual(
+            first.get_script(1),
+            "matlabbatch{1}.spm.tools.test.value = 1; % test_spm_object")
+        self.assertEqual(
+            second.get_script(2),
+            "matlabbatch{2}.spm.tools.test.value = 2; % test_spm_object")
+        self.assertIs(first.environment, second.environment)
+        self.assertIs(
+            spm_object.get_template(first.template),
+            spm_object.get_template(second.template))
+    
+    def test_pickle(self):
+        tool = Tool(1)
+        tool.get_script(1)
+        other = pickle.loads(pickle.dumps(tool))
+        self.assertEqual(other.get_script(1), tool.get_script(1))
+    
+    def test_no_bytecode_cache(self):
+        # Templates are not cached on disk by default
+        self.assertIsNone(spm_object.get_environment().bytecode_cache)
+    
+    def test_bytecode_cache(self):
+        directory = tempfile.mkdtemp()
+        environment = spm_object._environment
+        cache_home = os.environ.get("XDG_CACHE_HOME")
+        try:
+            os.environ["XDG_CACHE_HOME"] = directory
+            spm_object._environment = None
+            spm_object.use_bytecode_cache = True
+            
+            tool = Tool(1)
+            # Use a template which has not been compiled yet
+            tool.template += " % {}".format(directory)
+            tool.get_script(1)
+            self.assertTrue(
+                os.listdir(os.path.join(directory, "spire", "jinja2")))
+        finally:
+            spm_object._environment = environment
+            spm_object.use_bytecode_cache = False
+            if cache_home is None:
+                os.environ.pop("XDG_CACHE_HOME", None)
+            else:
+                os.environ["XDG_CACHE_HOME"] = cache_home
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,7 @@
+import io
+import os
+import shutil
+import tempfile
 import textwrap
 import unittest
 
@@ -44,5 +48,91 @@ class TestSPMUtils(unittest.TestCase):
                 spm_jobman('run',matlabbatch);
                 exit();"""))
     
+    def test_write_script(self):
+        design = spire.spm.factorial_design.FactorialDesign(
+            "/output",
+            spire.spm.factorial_design.OneSampleTTest(
+                ["scan{}".format(x) for x in range(100)]))
+        jobs = [design, spire.spm.ModelEstimation(design)]
+        
+        # The script is streamed
+        parts = list(design.iter_script(1))
+        self.assertTrue(len(parts) > 100)
+        self.assertEqual("".join(parts), design.get_script(1))
+        self.assertFalse(hasattr(design, "_design"))
+        
+        fd = io.StringIO()
+        spire.spm.write_script(fd, jobs)
+        self.assertEqual(fd.getvalue(), spire.spm.get_script(jobs))
+        
+        fd = io.StringIO()
+        spire.spm.write_script(fd, jobs, standalone=False)
+        self.assertEqual(
+            fd.getvalue(), spire.spm.get_script(jobs, standalone=False))
+
+class TestFind(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.environment = {
+            x: os.environ.get(x) for x in ["XDG_CACHE_HOME", "SPIRE_SPM_DIR"]}
+        os.environ["XDG_CACHE_HOME"] = os.path.join(self.directory, "cache")
+        os.environ.pop("SPIRE_SPM_DIR", None)
+        
+        # Fake MATLAB, printing the root of SPM and logging its calls
+        self.root = os.path.join(self.directory, "spm12")
+        os.mkdir(self.root)
+        self.log = os.path.join(self.directory, "log")
+        self.matlab = os.path.join(self.directory, "matlab")
+        with open(self.matlab, "w") as fd:
+            fd.write("#!/bin/sh\n")
+            fd.write("echo called >> {}\n".format(self.log))
+            fd.write("echo 'MATLAB banner'\n")
+            fd.write("printf '%s' {}\n".format(self.root))
+        os.chmod(self.matlab, 0o755)
+    
+    def tearDown(self):
+        for name, value in self.environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(self.directory)
+    
+    def test_cache(self):
+        self.assertEqual(spire.spm.find(self.matlab), self.root)
+        self.assertEqual(spire.spm.find(self.matlab), self.root)
+        self.assertEqual(self._calls(), 1)
+        self.assertTrue(os.path.isfile(spire.spm.get_find_cache()))
+        
+        # Different key
+        self.assertEqual(spire.spm.find(self.matlab, "'/foo'"), self.root)
+        self.assertEqual(self._calls(), 2)
+        
+        # Modified executable
+        stat = os.stat(self.matlab)
+        os.utime(self.matlab, ns=(stat.st_atime_ns, stat.st_mtime_ns+10**9))
+        self.assertEqual(spire.spm.find(self.matlab), self.root)
+        self.assertEqual(self._calls(), 3)
+        
+        # Explicit refresh
+        self.assertEqual(spire.spm.find(self.matlab, refresh=True), self.root)
+        self.assertEqual(self._calls(), 4)
+        
+        # Removed SPM directory
+        os.rmdir(self.root)
+        self.assertEqual(spire.spm.find(self.matlab), self.root)
+        self.assertEqual(self._calls(), 5)
+    
+    def test_environment(self):
+        os.environ["SPIRE_SPM_DIR"] = "/opt/spm"
+        self.assertEqual(spire.spm.find(self.matlab), "/opt/spm")
+        self.assertEqual(self._calls(), 0)
+    
+    def _calls(self):
+        if not os.path.isfile(self.log):
+            return 0
+        with open(self.log) as fd:
+            return len(fd.readlines())
+
 if __name__ == "__main__":
     unittest.main()
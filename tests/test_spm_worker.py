@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+import spire.spm
+import spire.spm.worker
+
+class TestSPMWorker(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = os.path.join(self.directory, "log")
+        self.command = [
+            sys.executable,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_engine.py"),
+            self.log]
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_command(self):
+        command = spire.spm.worker.get_command("octave", modality="pet")
+        self.assertEqual(command[:4], ["octave", "--no-gui", "--quiet", "--eval"])
+        self.assertTrue(command[4].startswith("spm('defaults','pet');"))
+        self.assertTrue(spire.spm.worker.sentinel in command[4])
+    
+    def test_run(self):
+        design = spire.spm.factorial_design.FactorialDesign(
+            "/output",
+            spire.spm.factorial_design.TwoSamplesTTest(["foo"], ["bar"]))
+        
+        with spire.spm.worker.Pool(self.command, 2) as pool:
+            self.assertIs(spire.spm.worker.Pool.current(), pool)
+            threads = [
+                threading.Thread(target=spire.spm.run, args=([design],))
+                for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertIsNone(spire.spm.worker.Pool.current())
+        
+        with open(self.log) as fd:
+            entries = [x.split() for x in fd if x.startswith(tuple("0123456789"))]
+        self.assertEqual(len(entries), 6)
+        # Workers are re-used
+        self.assertTrue(len(set(x[0] for x in entries)) <= 2)
+        
+        with open(self.log) as fd:
+            log = fd.read()
+        # SPM is not re-initialized for each job
+        self.assertFalse("initcfg" in log)
+        self.assertEqual(log.count("spm_jobman('run',matlabbatch);"), 6)
+    
+    def test_failure(self):
+        with spire.spm.worker.Pool(self.command) as pool:
+            with self.assertRaises(Exception):
+                pool.run("error('foo');")
+            # The worker is still usable
+            pool.run("disp('foo');")
+            self.assertEqual(len(pool._workers), 1)
+            
+            # A stopped worker is replaced
+            with self.assertRaises(Exception):
+                pool.run("exit();")
+            self.assertEqual(len(pool._workers), 0)
+            pool.run("disp('foo');")
+            self.assertEqual(len(pool._workers), 1)
+
+if __name__ == "__main__":
+    unittest.main()
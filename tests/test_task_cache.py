@@ -0,0 +1,72 @@
+import sys
+import unittest
+
+import spire
+
+class Factory(spire.TaskFactory):
+    def __init__(self, name):
+        spire.TaskFactory.__init__(self, name)
+        self.file_dep = ["{}.dep".format(name)]
+        self.targets = ["{}.target".format(name)]
+        self.actions = [["touch", self.targets[0]]]
+
+class TestTaskCache(unittest.TestCase):
+    def setUp(self):
+        self.objects = [Factory(x) for x in ["foo", "bar"]]
+    
+    def tearDown(self):
+        for object_ in self.objects:
+            spire.Registry.current().remove(object_)
+    
+    def test_graph(self):
+        namespace = {"__file__": "cache_tasks.py"}
+        graph = spire._get_graph(namespace)
+        self.assertIs(spire._get_graph(namespace), graph)
+        self.assertTrue("foo" in graph.doit_tasks)
+        
+        self.objects.append(Factory("baz"))
+        other_graph = spire._get_graph(namespace)
+        self.assertIsNot(other_graph, graph)
+        self.assertTrue("baz" in other_graph.doit_tasks)
+        
+        # Tasks created from unmodified objects are re-used
+        self.assertIs(other_graph.doit_tasks["foo"], graph.doit_tasks["foo"])
+    
+    def test_modification(self):
+        namespace = {"__file__": "cache_tasks.py"}
+        graph = spire._get_graph(namespace)
+        self.assertEqual(graph.parents["bar"], [])
+        
+        # Modification of an object after the creation of the graph
+        foo, bar = self.objects
+        bar.file_dep = [foo.targets[0]]
+        graph = spire._get_graph(namespace)
+        self.assertEqual(graph.parents["bar"], ["foo"])
+        self.assertEqual(graph.doit_tasks["bar"].file_dep, {"foo.target"})
+        
+        # In-place modification
+        foo.targets.append("foo.other")
+        bar.file_dep.append("foo.other")
+        graph = spire._get_graph(namespace)
+        self.assertEqual(graph.producer_of("foo.other"), "foo")
+        self.assertEqual(
+            graph.doit_tasks["bar"].file_dep, {"foo.target", "foo.other"})
+        
+        # Modification of the targets
+        version = spire.Registry.current().version
+        foo.targets = ["foo.new"]
+        self.assertNotEqual(spire.Registry.current().version, version)
+        graph = spire._get_graph(namespace)
+        self.assertEqual(graph.parents["bar"], [])
+        self.assertEqual(graph.doit_tasks["foo"].targets, ["foo.new"])
+    
+    def test_skipped(self):
+        tasks = {x.name: x for _, x in spire._get_registry_tasks()}
+        self.assertTrue("bar" in tasks)
+        
+        self.objects[1].skipped = True
+        tasks = {x.name: x for _, x in spire._get_registry_tasks()}
+        self.assertFalse("bar" in tasks)
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,88 @@
+import os
+import pathlib
+import sys
+import unittest
+
+import doit.task
+
+import spire
+
+class TestTaskGraph(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [
+            doit.task.Task("C", ["baz"], file_dep=["b", "a"], targets=["c"]),
+            doit.task.Task("A", ["foo"], file_dep=["a.dep"], targets=["a"]),
+            doit.task.Task("B", ["bar"], file_dep=["a"], targets=["b"]),
+            doit.task.Task("D", ["plip"], file_dep=["a", "b"], targets=["d"]),
+        ]
+        self.graph = spire.TaskGraph(self.tasks)
+    
+    def test_children(self):
+        self.assertEqual(
+            self.graph.children, 
+            {"A": ["C", "B", "D"], "B": ["C", "D"], "C": [], "D": []})
+    
+    def test_parents(self):
+        self.assertEqual(
+            self.graph.parents, 
+            {"A": [], "B": ["A"], "C": ["A", "B"], "D": ["A", "B"]})
+    
+    def test_producer_of(self):
+        self.assertEqual(self.graph.producer_of("a"), "A")
+        self.assertEqual(self.graph.producer_of("c"), "C")
+        self.assertIsNone(self.graph.producer_of("a.dep"))
+    
+    def test_topological_order(self):
+        self.assertEqual(self.graph.topological_order, ["A", "B", "C", "D"])
+    
+    def test_levels(self):
+        self.assertEqual(self.graph.get_levels(), [["A"], ["B"], ["C", "D"]])
+        self.assertEqual(self.graph.get_levels(["B"]), [["A"], ["B"]])
+        with self.assertRaises(Exception):
+            self.graph.get_levels(["E"])
+    
+    def test_levels_task_dep(self):
+        tasks = self.tasks + [
+            doit.task.Task("E", ["touch e"], task_dep=["D"]),
+            doit.task.Task("F", ["touch f"], setup=["E"]),
+            doit.task.Task("G", None, task_dep=["F", "A*"]),
+        ]
+        graph = spire.TaskGraph(tasks)
+        self.assertEqual(graph.get_dependencies("G"), ["F", "A"])
+        self.assertEqual(
+            graph.get_levels(), [["A"], ["B"], ["C", "D"], ["E"], ["F"], ["G"]])
+        self.assertEqual(
+            graph.get_levels(["F"]), [["A"], ["B"], ["D"], ["E"], ["F"]])
+        
+        # task_dep are not part of the file-based graph
+        self.assertEqual(graph.parents["E"], [])
+    
+    def test_path_key(self):
+        self.assertEqual(spire.path_key(pathlib.Path("a/b")), "a/b")
+        self.assertEqual(spire.path_key("./a//b"), "a/b")
+        self.assertEqual(spire.path_key("a/b", "/root"), "/root/a/b")
+        self.assertEqual(spire.path_key("/a/b", "/root"), "/a/b")
+        self.assertEqual(spire.path_key(""), "")
+    
+    def test_normalized_paths(self):
+        root = os.path.abspath("root")
+        tasks = [
+            doit.task.Task("A", ["foo"], targets=[pathlib.Path("a/b")]),
+            doit.task.Task("B", ["bar"], file_dep=["./a/b"], targets=["b"]),
+            doit.task.Task(
+                "C", ["baz"], file_dep=[os.path.join(root, "b")], targets=["c"]),
+        ]
+        graph = spire.TaskGraph(tasks, root)
+        self.assertEqual(graph.children, {"A": ["B"], "B": ["C"], "C": []})
+        self.assertEqual(graph.producer_of(os.path.join(root, "a/b")), "A")
+    
+    def test_cycle(self):
+        tasks = [
+            doit.task.Task("A", ["foo"], file_dep=["b"], targets=["a"]),
+            doit.task.Task("B", ["bar"], file_dep=["a"], targets=["b"]),
+        ]
+        with self.assertRaises(Exception):
+            spire.TaskGraph(tasks)
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())